@@ -16,3 +16,6 @@ admin.site.register(COPParticipant)
 admin.site.register(Invoice)
 admin.site.register(PostEventReport)
 admin.site.register(CustomUser)
+admin.site.register(QueuedEmail)
+admin.site.register(AnnouncementDelivery)
+admin.site.register(ImageJob)
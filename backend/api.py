@@ -0,0 +1,203 @@
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .models import COPEventApplication
+from .models import PostEventReport
+from .caching import content_modified, content_version
+from .pagination import keyset_paginate
+from .routers import read_from_replica
+from .stats import get_cop_stats
+
+API_VERSION = 'v1'
+
+# Public name -> attribute path; ?fields= picks a subset
+EVENT_FIELDS = {
+    'id': 'pk',
+    'title': 'proposed_title',
+    'event_type': 'event_type',
+    'number_of_speakers': 'number_of_speakers',
+    'start_time': 'start_time',
+    'end_time': 'end_time',
+    'status': 'status',
+    'date_created': 'date_created',
+    'organisation_id': 'org_id',
+    'organisation': 'org.user.name',
+}
+
+REPORT_FIELDS = {
+    'id': 'pk',
+    'event_id': 'event_id',
+    'event_title': 'event.proposed_title',
+    'organisation': 'event.org.user.name',
+    'date_created': 'date_created',
+}
+
+# Detail endpoints also return the long columns the listings leave out
+EVENT_DETAIL_FIELDS = {**EVENT_FIELDS, 'description': 'description'}
+REPORT_DETAIL_FIELDS = {
+    **REPORT_FIELDS,
+    'description': 'description',
+    'image_url': 'image_url',
+    'video_url': 'video_url',
+}
+
+STATS_FIELDS = [
+    'side_events', 'session', 'total_speakers', 'total_duration', 'host', 'delegates', 'organisations',
+]
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _resolve(obj, path):
+    for name in path.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def selected_fields(request, available):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(available)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise BadRequest('Unknown fields: %s' % ', '.join(unknown))
+    return names
+
+
+def serialize(obj, fields, paths):
+    return {name: _resolve(obj, paths[name]) for name in fields}
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri('%s?%s' % (request.path, query.urlencode()))
+
+
+def _page_size(request):
+    limit = request.GET.get('limit')
+    if not limit:
+        return settings.LIST_PAGE_SIZE
+    if not limit.isdigit() or not 0 < int(limit) <= settings.API_MAX_PAGE_SIZE:
+        raise BadRequest('limit must be between 1 and %d' % settings.API_MAX_PAGE_SIZE)
+    return int(limit)
+
+
+def _date_param(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise BadRequest('%s must be a date such as 2023-11-30' % name)
+    return day
+
+
+def list_response(request, queryset, ordering, paths):
+    fields = selected_fields(request, paths)
+    page = keyset_paginate(request, queryset, ordering, _page_size(request))
+    return {
+        'data': [serialize(obj, fields, paths) for obj in page],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.prev_cursor),
+    }
+
+
+# Every change to events, reports, participants or organisations bumps the
+# content version, so the validators below cost a cache read and repeated
+# polls of unchanged data get a 304 before the view runs any query. Workers
+# only agree on them through a shared cache (see CACHES; check backend.W001).
+def content_etag(request, *args, **kwargs):
+    key = '%s:%s:%s' % (API_VERSION, content_version(), request.get_full_path())
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def content_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(content_modified(), dt_timezone.utc)
+
+
+def api_view(view):
+    # GET/HEAD only, conditional and read from the replica; the view returns
+    # the JSON body and BadRequest becomes a 400
+    @require_safe
+    @condition(etag_func=content_etag, last_modified_func=content_last_modified)
+    @read_from_replica
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Http404:
+            return JsonResponse({'error': 'Not found.'}, status=404)
+        response = JsonResponse(data)
+        # Clients may keep the body but must revalidate before reusing it
+        patch_cache_control(response, no_cache=True)
+        return response
+    return wrapped
+
+
+@api_view
+def events(request):
+    queryset = COPEventApplication.objects.for_listing()
+    day = _date_param(request, 'date')
+    if day:
+        queryset = queryset.starting_on(day)
+    start = _date_param(request, 'from')
+    if start:
+        queryset = queryset.starting_from(start)
+    if request.GET.get('status'):
+        queryset = queryset.filter(status=request.GET['status'])
+    if request.GET.get('org'):
+        if not request.GET['org'].isdigit():
+            raise BadRequest('org must be an organisation id')
+        queryset = queryset.filter(org_id=request.GET['org'])
+    return list_response(request, queryset, ('start_time', 'id'), EVENT_FIELDS)
+
+
+@api_view
+def event(request, pk):
+    fields = selected_fields(request, EVENT_DETAIL_FIELDS)
+    obj = get_object_or_404(COPEventApplication.objects.select_related('org__user'), pk=pk)
+    return {'data': serialize(obj, fields, EVENT_DETAIL_FIELDS)}
+
+
+@api_view
+def reports(request):
+    queryset = PostEventReport.objects.for_listing()
+    if request.GET.get('event'):
+        if not request.GET['event'].isdigit():
+            raise BadRequest('event must be an event id')
+        queryset = queryset.filter(event_id=request.GET['event'])
+    return list_response(request, queryset, ('-date_created', '-id'), REPORT_FIELDS)
+
+
+@api_view
+def report(request, pk):
+    fields = selected_fields(request, REPORT_DETAIL_FIELDS)
+    obj = get_object_or_404(PostEventReport.objects.select_related('event__org__user'), pk=pk)
+    return {'data': serialize(obj, fields, REPORT_DETAIL_FIELDS)}
+
+
+@api_view
+def stats(request):
+    fields = selected_fields(request, STATS_FIELDS)
+    # The same cached snapshot the dashboards read
+    totals = get_cop_stats()
+    return {'data': {name: totals[name] for name in fields}}
@@ -1,11 +1,100 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
 from .models import CustomUser
+from .models import Organisation
+from .caching import COUNTER_KEY, record
+
+FAILURE_KEY = 'login_failures:%s:%s'
+LOGIN_OUTCOMES = ['throttled', 'failed']
+
+
+def client_ip(request):
+    # LOGIN_IP_HEADER names the META key holding the visitor's address, e.g.
+    # HTTP_X_REAL_IP behind a proxy that sets it
+    return request.META.get(settings.LOGIN_IP_HEADER, '') if request is not None else ''
+
+
+def _failure_keys(request, email):
+    account = hashlib.md5(email.lower().encode()).hexdigest()
+    keys = [(FAILURE_KEY % ('account', account), settings.LOGIN_MAX_FAILURES_PER_ACCOUNT)]
+    ip = client_ip(request)
+    if ip:
+        keys.append((FAILURE_KEY % ('ip', ip), settings.LOGIN_MAX_FAILURES_PER_IP))
+    return keys
+
+
+def login_throttled(request, email):
+    keys = _failure_keys(request, email)
+    failures = cache.get_many([key for key, _ in keys])
+    return any(failures.get(key, 0) >= limit for key, limit in keys)
+
+
+def note_failure(request, email):
+    # The window starts at the first failure and is not extended by later ones
+    for key, _ in _failure_keys(request, email):
+        cache.add(key, 0, settings.LOGIN_THROTTLE_WINDOW)
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+    record('login', 'failed')
+
+
+def login_counters():
+    return {outcome: cache.get(COUNTER_KEY % ('login', outcome), 0) for outcome in LOGIN_OUTCOMES}
+
+
+def current_organisation(request):
+    # The signed-in user's organisation, or None. EmailBackend loads it in the
+    # same query as the user, so asking for it again costs nothing.
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.organisation_user
+    except Organisation.DoesNotExist:
+        return None
+
 
 class EmailBackend(ModelBackend):
+    # The only authentication backend: one user lookup and one password hash per
+    # attempt, and none at all once the account or address is throttled
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None or password is None:
+            return None
+
+        email = CustomUser.objects.normalize_email(username)
+        if login_throttled(request, email):
+            record('login', 'throttled')
+            if request is not None:
+                request.login_throttled = True
+            return None
+
+        try:
+            user = CustomUser.objects.select_related('organisation_user').get(email=email)
+        except CustomUser.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            CustomUser().set_password(password)
+            note_failure(request, email)
+            return None
+
+        # check_password() also rewrites a hash made by an older hasher or cost
+        # profile, so accounts move to PASSWORD_HASHER as their owners sign in
+        if user.check_password(password) and self.user_can_authenticate(user):
+            cache.delete(_failure_keys(request, email)[0][0])
+            return user
+        note_failure(request, email)
+        return None
+
+    def get_user(self, user_id):
+        # Runs once per request for the session's user; the join saves the
+        # organisation views a query each
         try:
-            user = CustomUser.objects.get(email=username)
-            if user.check_password(password):
-                return user
+            user = CustomUser.objects.select_related('organisation_user').get(pk=user_id)
         except CustomUser.DoesNotExist:
             return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,118 @@
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .mail import ConnectionLost, send_reconnecting
+from .models import AnnouncementDelivery
+from .models import COPEventAnnouncement
+from .models import COPEventApplication
+from .models import CustomUser
+
+
+def audience_segment(segment):
+    # Unknown segments raise rather than widening the audience to everyone
+    if segment not in dict(COPEventAnnouncement.AUDIENCE_CHOICES):
+        raise ValueError('Unknown audience segment: %r' % (segment,))
+
+    users = CustomUser.objects.filter(is_active=True)
+    if segment == 'approved_organisations':
+        return users.filter(organisation_user__status='Approved')
+    if segment == 'event_hosts':
+        return users.filter(Exists(COPEventApplication.objects.filter(org__user=OuterRef('pk'), status='Approved')))
+    if segment.startswith('delegates:'):
+        return users.filter(participant_user__accreditation_type=segment.split(':', 1)[1])
+    return users
+
+
+def announcement_recipients(announcement):
+    # Announcements without an audience predate targeting and went to everyone
+    segments = announcement.audience or ['all']
+    if 'all' in segments:
+        segments = ['all']
+
+    # UNION removes users who fall into more than one segment
+    querysets = [audience_segment(segment).values_list('email', 'name') for segment in segments]
+    if len(querysets) == 1:
+        return querysets[0]
+    return querysets[0].union(*querysets[1:])
+
+
+def queue_broadcast(announcement):
+    # Recipient rows are written in chunks while the user table is streamed,
+    # and existing rows are skipped so a broadcast can be queued again safely
+    size = settings.BROADCAST_CHUNK_SIZE
+    recipients = announcement_recipients(announcement).iterator(chunk_size=size)
+
+    batch = []
+    for email, name in recipients:
+        batch.append(AnnouncementDelivery(announcement=announcement, email=email, name=name))
+        if len(batch) >= size:
+            AnnouncementDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        AnnouncementDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def broadcast_message(announcement, delivery, connection):
+    body = render_to_string('account/announcement_email.txt', {
+        'announcement': announcement,
+        'name': delivery.name,
+    })
+    return EmailMessage(announcement.subject, body, 'no-reply@mhinnov8.com.ng', [delivery.email], connection=connection)
+
+
+def send_delivery(announcement, delivery, connection):
+    send_reconnecting(connection, lambda connection: broadcast_message(announcement, delivery, connection))
+
+
+def send_broadcast(announcement):
+    # Sends the pending deliveries in chunks over one connection. Status is
+    # saved after every chunk, so a run that dies part way resumes from the
+    # first unsent recipient and re-sends at most one chunk. A delivery that
+    # errors is marked Failed so it cannot hold up the recipients after it;
+    # losing the server leaves the rest Pending for the next run.
+    pending = announcement.deliveries.filter(status='Pending').order_by('id')
+    sent = 0
+
+    connection = get_connection(settings.MAIL_DELIVERY_BACKEND)
+    try:
+        connection.open()
+    except Exception:
+        return sent
+    try:
+        while True:
+            chunk = list(pending[:settings.BROADCAST_CHUNK_SIZE])
+            if not chunk:
+                break
+
+            done = []
+            try:
+                for delivery in chunk:
+                    try:
+                        send_delivery(announcement, delivery, connection)
+                    except ConnectionLost:
+                        return sent
+                    except Exception as e:
+                        delivery.status = 'Failed'
+                        delivery.error = str(e)
+                    else:
+                        delivery.status = 'Sent'
+                        delivery.date_sent = timezone.now()
+                        sent += 1
+                    done.append(delivery)
+            finally:
+                AnnouncementDelivery.objects.bulk_update(done, ['status', 'error', 'date_sent'])
+
+            time.sleep(settings.BROADCAST_THROTTLE)
+    finally:
+        connection.close()
+    return sent
+
+
+def dispatch_broadcasts():
+    announcements = COPEventAnnouncement.objects.filter(deliveries__status='Pending').distinct()
+    return sum(send_broadcast(announcement) for announcement in announcements)
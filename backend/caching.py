@@ -0,0 +1,92 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+
+CONTENT_VERSION_KEY = 'content_version'
+CONTENT_MODIFIED_KEY = 'content_modified'
+COUNTER_KEY = 'cache_counter:%s:%s'
+COUNTED_CACHES = ['page', 'stats']
+
+
+def _new_version():
+    # Seeded from the clock so an evicted counter never reuses an old version
+    return int(time.time())
+
+
+def content_version():
+    return cache.get_or_set(CONTENT_VERSION_KEY, _new_version, None)
+
+
+def content_modified():
+    # When content last changed, as a timestamp; answers Last-Modified without a query
+    return cache.get_or_set(CONTENT_MODIFIED_KEY, time.time, None)
+
+
+def invalidate_content():
+    # Every cached page, fragment and statistics snapshot has the version in
+    # its key, so bumping it drops them all at once
+    try:
+        cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        cache.set(CONTENT_VERSION_KEY, _new_version(), None)
+    cache.set(CONTENT_MODIFIED_KEY, time.time(), None)
+
+
+def record(name, outcome):
+    key = COUNTER_KEY % (name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_counters():
+    counters = {}
+    for name in COUNTED_CACHES:
+        counters[name] = {
+            outcome: cache.get(COUNTER_KEY % (name, outcome), 0)
+            for outcome in ('hit', 'miss')
+        }
+    return counters
+
+
+def _is_cacheable(request):
+    return (
+        request.method == 'GET'
+        and not request.user.is_authenticated
+        # A pending flash message belongs to this visitor only
+        and not len(messages.get_messages(request))
+    )
+
+
+def cache_for_anonymous(view):
+    # Whole-response cache for public pages; signed-in users always get a
+    # fresh render because the pages show their account links
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view(request, *args, **kwargs)
+
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = 'page:%s:%s' % (content_version(), path)
+        response = cache.get(key)
+        if response is not None:
+            record('page', 'hit')
+            return response
+
+        record('page', 'miss')
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.cookies:
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+        return response
+    return wrapped
+
+
+def content_version_context(request):
+    # Lets templates key {% cache %} fragments on the current content version
+    return {'content_version': content_version()}
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache'}
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    # The content version behind page invalidation and the API's ETag and
+    # Last-Modified must be one value for every worker, or each worker answers
+    # with its own validators and conditional GETs rarely return 304
+    if settings.WEB_CONCURRENCY > 1 and settings.CACHES['default']['BACKEND'] in LOCAL_CACHES:
+        return [Warning(
+            'The default cache is private to each worker process.',
+            hint='Set CACHE_BACKEND to file or redis when WEB_CONCURRENCY is above 1.',
+            id='backend.W001',
+        )]
+    return []
@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def third_party(request):
+    # Lets base/base.html leave out every external include, e.g. on an offline venue network
+    return {
+        'third_party_includes': settings.THIRD_PARTY_INCLUDES,
+        'analytics_site': settings.ANALYTICS_SITE if settings.THIRD_PARTY_INCLUDES else None,
+    }
@@ -0,0 +1,182 @@
+import gzip
+import re
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+STATIC_DIR = APP_DIR / 'static'
+TEMPLATE_DIR = APP_DIR / 'templates'
+CRITICAL_TEMPLATE = TEMPLATE_DIR / 'base' / 'critical_css.html'
+
+# Stylesheets loaded by base/base.html; each gets a .purged.css sibling so its
+# relative url() references keep working
+STYLESHEETS = [
+    'assets/css/nucleo-icons.css',
+    'assets/css/nucleo-svg.css',
+    'assets/css/soft-ui-dashboard.css',
+    'assets/css/icons.css',
+]
+
+# Files whose words count as used class and id names: the templates, the form
+# widget attrs and the scripts that toggle classes at runtime
+SOURCE_PATTERNS = [
+    (TEMPLATE_DIR, '**/*.html'),
+    (APP_DIR, 'forms.py'),
+    (STATIC_DIR, 'assets/js/**/*.js'),
+]
+
+# The base template plus the landing and dashboard pages whose first screen
+# most visitors see; rules they use are inlined so the page paints without
+# waiting for a stylesheet
+CRITICAL_TEMPLATES = ['base/base.html', 'home.html', 'cop/dashboard.html', 'organisation/dashboard.html']
+
+# Classes Bootstrap builds at runtime or Django messages add
+SAFELIST = {
+    'show', 'showing', 'hiding', 'fade', 'collapse', 'collapsing', 'modal-open',
+    'modal-backdrop', 'modal-static', 'was-validated', 'is-valid', 'is-invalid',
+    'success', 'error', 'info', 'warning', 'debug',
+}
+
+WORD = re.compile(r'-?[A-Za-z_][\w-]*')
+SELECTOR_NAME = re.compile(r'[.#](-?[A-Za-z_][\w-]*)')
+PARENTHESES = re.compile(r'\([^()]*\)')
+AT_RULE = re.compile(r'@[\w-]+')
+# url() other than an inline data: URI, which costs no request
+FETCHED_URL = re.compile(r'url\(\s*(?![\'"]?data:)')
+COMMENT = re.compile(r'/\*.*?\*/', re.S)
+LICENSE = re.compile(r'/\*!.*?\*/', re.S)
+KEPT_AT_RULES = ('@font-face', '@keyframes', '@-webkit-keyframes', '@page', '@charset', '@import')
+NESTED_AT_RULES = ('@media', '@supports')
+
+
+def used_words(files):
+    words = set(SAFELIST)
+    for path in files:
+        words.update(WORD.findall(path.read_text(errors='ignore')))
+    return words
+
+
+def source_files():
+    for directory, pattern in SOURCE_PATTERNS:
+        yield from sorted(directory.glob(pattern))
+
+
+def split_blocks(text):
+    # Top-level (prelude, body) pairs; body is None for statements such as @import
+    blocks = []
+    start = depth = 0
+    quote = None
+    body_start = prelude = None
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote and text[index - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                prelude, body_start = text[start:index], index + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude.strip(), text[body_start:index]))
+                start = index + 1
+        elif char == ';' and depth == 0:
+            blocks.append((text[start:index].strip(), None))
+            start = index + 1
+    return blocks
+
+
+def split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return [' '.join(selector.split()) for selector in selectors if selector.strip()]
+
+
+def selector_used(selector, words):
+    # Names inside :not(), :is() and the like only narrow a match, so they are ignored
+    while PARENTHESES.search(selector):
+        selector = PARENTHESES.sub('', selector)
+    return all(name in words for name in SELECTOR_NAME.findall(selector))
+
+
+def compact(body):
+    body = ' '.join(body.split())
+    return re.sub(r'\s*([;{}])\s*', r'\1', body).rstrip(';')
+
+
+def purge(text, words, critical=False):
+    # Keeps the rules whose every selector name is in `words`. With critical=True
+    # only plain rules are kept: fonts, animations and anything fetching a url()
+    # are left to the full stylesheet, while inline data: images stay.
+    output = []
+    for prelude, body in split_blocks(COMMENT.sub('', text)):
+        at_rule = AT_RULE.match(prelude)
+        name = at_rule.group().lower() if at_rule else None
+        if name in NESTED_AT_RULES:
+            if critical and 'print' in prelude:
+                continue
+            inner = purge(body, words, critical)
+            if inner:
+                output.append('%s{%s}' % (' '.join(prelude.split()), inner))
+        elif name is not None:
+            if not critical and name in KEPT_AT_RULES:
+                output.append(' '.join(prelude.split()) + ('{%s}' % compact(body) if body is not None else ';'))
+        elif body is not None:
+            if critical and FETCHED_URL.search(body):
+                continue
+            kept = [selector for selector in split_selectors(prelude) if selector_used(selector, words)]
+            if kept:
+                output.append('%s{%s}' % (','.join(kept), compact(body)))
+    return ''.join(output)
+
+
+def purged_name(stylesheet):
+    return stylesheet[:-len('.css')] + '.purged.css'
+
+
+def gzip_size(data):
+    return len(gzip.compress(data.encode(), 9))
+
+
+def build_css():
+    # Writes the purged stylesheets and the critical CSS include, returning
+    # {name: (original text, output text)} for the report
+    words = used_words(source_files())
+    critical_words = used_words(TEMPLATE_DIR / name for name in CRITICAL_TEMPLATES)
+    critical_words &= words
+
+    results = {}
+    critical = []
+    for stylesheet in STYLESHEETS:
+        source = (STATIC_DIR / stylesheet).read_text()
+        licenses = ''.join(LICENSE.findall(source))
+        purged = licenses + purge(source, words)
+        (STATIC_DIR / purged_name(stylesheet)).write_text(purged + '\n')
+        results[stylesheet] = (source, purged)
+        critical.append(purge(source, critical_words, critical=True))
+
+    critical_css = ''.join(critical)
+    CRITICAL_TEMPLATE.write_text(
+        '{# Generated by `manage.py build_css`; edit the templates or stylesheets and rebuild instead. #}\n'
+        '{%% verbatim %%}<style>%s</style>{%% endverbatim %%}\n' % critical_css
+    )
+    return results, critical_css
+
+
+def first_paint_estimate(stylesheet_sizes, inline_size, rtt, kbps):
+    # Seconds spent on render-blocking CSS over a link with `rtt` milliseconds of
+    # latency and `kbps` of bandwidth: one round trip for the parallel
+    # stylesheet requests plus the transfer of everything that blocks
+    seconds = (sum(stylesheet_sizes) + inline_size) * 8 / (kbps * 1000)
+    if stylesheet_sizes:
+        seconds += rtt / 1000
+    return seconds
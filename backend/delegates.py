@@ -0,0 +1,204 @@
+import csv
+import io
+import os
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .forms import DelegateRowForm
+from .models import COPParticipant
+from .models import CustomUser
+from .models import Organisation
+from .caching import invalidate_content
+
+DELEGATE_ROLE = "Activist"
+IMPORT_BATCH_SIZE = 500
+USER_NAME_LENGTH = CustomUser._meta.get_field('name').max_length
+
+COLUMN_ALIASES = {
+    'organisation': 'organization',
+    'accreditation': 'accreditation_type',
+    'accreditation_no': 'accreditation_number',
+}
+
+
+class DelegateFileError(Exception):
+    # The upload as a whole could not be read; reported against delegate_file
+    pass
+
+
+class DelegateImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.new_users = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+def delegate_password_hash():
+    # Hashed once and shared by a whole batch rather than once per account
+    if settings.DELEGATE_DEFAULT_PASSWORD:
+        return make_password(settings.DELEGATE_DEFAULT_PASSWORD)
+    return None
+
+
+def user_name_error(name):
+    # Account names are shorter than participant names
+    if len(name) > USER_NAME_LENGTH:
+        return 'Name must be at most %d characters to create an account.' % USER_NAME_LENGTH
+    return None
+
+
+def new_delegate_user(email, name, password_hash=None):
+    user = CustomUser(email=email, name=name, role=DELEGATE_ROLE)
+    if password_hash:
+        user.password = password_hash
+    else:
+        user.set_unusable_password()
+    return user
+
+
+def delegate_welcome_message(user, domain):
+    if user.has_usable_password():
+        return user.verification_message(domain)
+
+    # The reset token hashes the current password, so the link stops working once used
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    message = render_to_string('account/delegate_welcome.html', {
+        'user': user,
+        'domain': domain,
+        'uid': uid,
+        'token': token,
+    })
+
+    email = EmailMultiAlternatives('Set up your NCCC account', message, 'no-reply@mhinnov8.com.ng', [user.email])
+    email.attach_alternative(message, 'text/html')
+    return email
+
+
+def _column_name(header):
+    name = str(header or '').strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _read_csv(upload):
+    try:
+        text = upload.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise DelegateFileError('The CSV file is not UTF-8 encoded. Save it as "CSV UTF-8" and upload it again.')
+    reader = csv.reader(io.StringIO(text))
+    return list(reader)
+
+
+def _read_xlsx(upload):
+    try:
+        workbook = load_workbook(upload, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError):
+        raise DelegateFileError('The file is not a valid XLSX workbook.')
+    try:
+        return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def read_delegate_rows(upload):
+    # Yields (spreadsheet row number, {column: value}) for every non-empty row
+    extension = os.path.splitext(upload.name)[1].lower()
+    rows = _read_xlsx(upload) if extension == '.xlsx' else _read_csv(upload)
+    if not rows:
+        return
+
+    columns = [_column_name(header) for header in rows[0]]
+    for number, row in enumerate(rows[1:], start=2):
+        values = ['' if value is None else str(value).strip() for value in row]
+        if any(values):
+            yield number, dict(zip(columns, values))
+
+
+def import_delegates(upload):
+    result = DelegateImportResult()
+    rows = list(read_delegate_rows(upload))
+
+    # Everything the per-row checks need is loaded up front in a handful of queries
+    emails = {CustomUser.objects.normalize_email(row.get('email', '')) for _, row in rows}
+    numbers = {row.get('accreditation_number', '') for _, row in rows}
+    users = {user.email: user for user in CustomUser.objects.filter(email__in=emails)}
+    accredited_emails = set(
+        COPParticipant.objects.filter(user__email__in=emails).values_list('user__email', flat=True)
+    )
+    taken_numbers = set(
+        COPParticipant.objects.filter(accreditation_number__in=numbers).values_list('accreditation_number', flat=True)
+    )
+    organisations = {
+        name.lower(): pk for pk, name in Organisation.objects.values_list('pk', 'user__name')
+    }
+
+    participants = []
+    new_users = {}
+    password_hash = delegate_password_hash()
+    for number, row in rows:
+        form = DelegateRowForm(data=row)
+        if not form.is_valid():
+            for field, messages in form.errors.items():
+                label = field if field != '__all__' else 'row'
+                result.add_error(number, '%s: %s' % (label, ' '.join(messages)))
+            continue
+
+        data = form.cleaned_data
+        email = CustomUser.objects.normalize_email(data['email'])
+        if data['accreditation_number'] in taken_numbers:
+            result.add_error(number, 'Accreditation number %s is already in use.' % data['accreditation_number'])
+            continue
+        if email in accredited_emails:
+            result.add_error(number, '%s is already accredited.' % email)
+            continue
+
+        user = users.get(email) or new_users.get(email)
+        if user is None and user_name_error(data['name']):
+            result.add_error(number, 'name: %s' % user_name_error(data['name']))
+            continue
+        if user is None:
+            user = new_delegate_user(email, data['name'], password_hash)
+            new_users[email] = user
+
+        participant = form.save(commit=False)
+        participant.email = email
+        organisation = row.get('organization', '')
+        participant.organization_id = organisations.get(organisation.lower())
+        if participant.organization_id is None and organisation and not participant.not_listed:
+            participant.not_listed = organisation
+        participants.append((participant, email))
+
+        taken_numbers.add(data['accreditation_number'])
+        accredited_emails.add(email)
+
+    if participants:
+        with transaction.atomic():
+            CustomUser.objects.bulk_create(new_users.values(), batch_size=IMPORT_BATCH_SIZE)
+            # Re-read the new users so their ids are known on every database backend
+            created_users = CustomUser.objects.filter(email__in=new_users.keys())
+            users.update((user.email, user) for user in created_users)
+
+            for participant, email in participants:
+                participant.user = users[email]
+            COPParticipant.objects.bulk_create(
+                [participant for participant, _ in participants], batch_size=IMPORT_BATCH_SIZE
+            )
+        # bulk_create() sends no post_save signals
+        invalidate_content()
+
+    result.created = len(participants)
+    result.new_users = [users[email] for email in new_users]
+    return result
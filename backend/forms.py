@@ -1,5 +1,6 @@
 from django import forms
 from django.forms import ModelForm, ValidationError
+from django.core.validators import FileExtensionValidator
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.forms import PasswordResetForm as DjangoPasswordResetForm
 from django.contrib.auth.forms import SetPasswordForm as DjangoSetPasswordForm
@@ -7,10 +8,32 @@ from django.contrib.auth.forms import PasswordChangeForm as DjangoPasswordChange
 
 
 from .models import *
+from .uploads import RejectedUpload
 
 class DateLocal(forms.DateTimeInput):
     input_type = 'datetime-local'
 
+
+class UploadErrorsMixin:
+    # Files refused by backend.uploads.LimitedUploadHandler arrive as
+    # RejectedUpload placeholders; they are taken out of the files and their
+    # reason is reported against the field instead
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = {
+            name: upload.error for name, upload in self.files.items() if isinstance(upload, RejectedUpload)
+        }
+        if self.upload_errors:
+            self.files = self.files.copy()
+            for name in self.upload_errors:
+                del self.files[name]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name, error in self.upload_errors.items():
+            self.add_error(name if name in self.fields else None, error)
+        return cleaned_data
+
 class RegisterForm(UserCreationForm):
     password1 = forms.CharField(
         widget=forms.PasswordInput(attrs={'class': 'form-control'}),
@@ -84,7 +107,7 @@ class CustomPasswordChangeForm(DjangoPasswordChangeForm):
         label='Confirm Password'
     )
 
-class OrganisationForm(ModelForm):
+class OrganisationForm(UploadErrorsMixin, ModelForm):
     class Meta:
         model = Organisation
         fields = ['logo', 'organisation_type', 'contact_number', 'address_line',
@@ -134,7 +157,30 @@ class DelegateForm(ModelForm):
             'not_listed': 'Organisation, if not listed above',
         }
 
-class EventForm(ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Option labels come from Organisation.__str__, which reads user.name
+        self.fields['organization'].queryset = Organisation.objects.select_related('user')
+
+class DelegateRowForm(DelegateForm):
+    # Spreadsheet rows name their organisation and are checked for duplicates
+    # in bulk by import_delegates(), so the per-row queries are skipped here
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        del self.fields['organization']
+
+    def validate_unique(self):
+        pass
+
+class DelegateImportForm(UploadErrorsMixin, forms.Form):
+    delegate_file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+        validators=[FileExtensionValidator(['csv', 'xlsx'])],
+        label='Delegate list (CSV or XLSX)',
+        help_text='Columns: accreditation_type, accreditation_number, name, email, organisation, not_listed',
+    )
+
+class EventForm(UploadErrorsMixin, ModelForm):
     class Meta:
         model = COPEventApplication
         fields = ['org', 'proposed_title', 'event_type', 'number_of_speakers', 'start_time',
@@ -154,6 +200,10 @@ class EventForm(ModelForm):
         labels = {
             'org' : 'Organisation',
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['org'].queryset = Organisation.objects.select_related('user')
     
     def clean(self):
         cleaned_data = super().clean()
@@ -189,9 +239,16 @@ class ReportForm(ModelForm):
         }
 
 class AnnouncementForm(ModelForm):
+    audience = forms.MultipleChoiceField(
+        choices=COPEventAnnouncement.AUDIENCE_CHOICES,
+        initial=['all'],
+        widget=forms.CheckboxSelectMultiple,
+        label='Send to',
+    )
+
     class Meta:
         model = COPEventAnnouncement
-        fields = ['subject', 'message', 'sender']
+        fields = ['subject', 'message', 'sender', 'audience']
         widgets = {
             'subject': forms.TextInput(attrs={'class': 'form-control'}),
             'sender': forms.TextInput(attrs={'class': 'form-control'}),
@@ -199,7 +256,7 @@ class AnnouncementForm(ModelForm):
             #'flier': forms.ClearableFileInput(attrs={'class':'form-control'}),
         }
 
-class OrgEventForm(ModelForm):
+class OrgEventForm(UploadErrorsMixin, ModelForm):
     class Meta:
         model = COPEventApplication
         fields = ['proposed_title', 'event_type', 'number_of_speakers', 'start_time',
@@ -254,7 +311,7 @@ class InvoiceForm(ModelForm):
                     'currency' : 'Type of Currency',
                 }
 
-class PaidForm(ModelForm):
+class PaidForm(UploadErrorsMixin, ModelForm):
     class Meta:
         model = Invoice
         fields = ['amount_paid', 'date_paid', 'proof']
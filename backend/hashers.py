@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    # Cost parameters come from settings so `manage.py calibrate_hasher` can fit
+    # them to the host. Hashes made with other parameters are upgraded by
+    # check_password() on the user's next successful login.
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # For hosts without argon2-cffi; select it with PASSWORD_HASHER=pbkdf2
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,129 @@
+import io
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .caching import invalidate_content
+from .models import ImageJob
+from .queues import claim_due
+
+# (model label, image field, thumbnail field or None) for every processed upload
+IMAGE_FIELDS = [
+    ('backend.Organisation', 'logo', 'logo_thumbnail'),
+    ('backend.COPEventApplication', 'flier', None),
+    ('backend.Announcement', 'image', None),
+    ('backend.AnnouncementImage', 'image', None),
+    ('backend.Invoice', 'proof', None),
+]
+
+
+def image_fields(model):
+    label = model._meta.label
+    return [(field, thumbnail) for model_label, field, thumbnail in IMAGE_FIELDS if model_label == label]
+
+
+def output_format():
+    if settings.IMAGE_FORMAT == 'WEBP' and features.check('webp'):
+        return 'WEBP', '.webp'
+    return 'JPEG', '.jpg'
+
+
+def _encode(image, image_format):
+    # Saving without exif= or icc_profile= leaves the camera metadata behind
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=settings.IMAGE_QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def optimise_image(file, thumbnail=False):
+    # Returns (resized image, thumbnail or None) as ContentFiles plus the extension
+    image_format, extension = output_format()
+    with Image.open(file) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        image.thumbnail((settings.IMAGE_MAX_DIMENSION, settings.IMAGE_MAX_DIMENSION))
+        resized = _encode(image, image_format)
+
+        small = None
+        if thumbnail:
+            small = _encode(ImageOps.fit(image, settings.IMAGE_THUMBNAIL_SIZE), image_format)
+    return resized, small, extension
+
+
+def queue_image_jobs(instance, fields):
+    ImageJob.objects.bulk_create([
+        ImageJob(
+            model_label=instance._meta.label,
+            object_id=str(instance.pk),
+            field=field,
+            name=getattr(instance, field).name,
+        )
+        for field in fields
+    ])
+
+
+def process_image_job(job):
+    model = apps.get_model(job.model_label)
+    thumbnail_field = dict(image_fields(model)).get(job.field)
+    instance = model.objects.filter(pk=job.object_id).first()
+    # A deleted row or a file replaced since the job was queued has nothing to do
+    if instance is None or getattr(instance, job.field).name != job.name:
+        return
+
+    fieldfile = getattr(instance, job.field)
+    storage = fieldfile.storage
+    with fieldfile.open('rb'):
+        resized, small, extension = optimise_image(fieldfile, thumbnail=thumbnail_field is not None)
+
+    base = os.path.splitext(job.name)[0]
+    updates = {job.field: storage.save(base + extension, resized)}
+    old_files = [job.name]
+    if thumbnail_field:
+        thumbnail = getattr(instance, thumbnail_field)
+        upload_to = model._meta.get_field(thumbnail_field).upload_to
+        updates[thumbnail_field] = storage.save(upload_to + os.path.basename(base) + extension, small)
+        if thumbnail:
+            old_files.append(thumbnail.name)
+
+    # update() rather than save() so the row's other columns and signals are untouched
+    if model.objects.filter(pk=instance.pk, **{job.field: job.name}).update(**updates):
+        for name in old_files:
+            if name not in updates.values():
+                storage.delete(name)
+        invalidate_content()
+    else:
+        for name in updates.values():
+            storage.delete(name)
+
+
+def claim_image_jobs(batch_size):
+    # Leased like the mail outbox so concurrent workers skip each other's jobs
+    return claim_due(ImageJob, batch_size, settings.IMAGE_JOB_LEASE)
+
+
+def dispatch_image_jobs(batch_size=None):
+    batch = claim_image_jobs(batch_size or settings.IMAGE_JOB_BATCH_SIZE)
+    done = failed = 0
+    for job in batch:
+        job.attempts += 1
+        try:
+            process_image_job(job)
+        except Exception as e:
+            job.last_error = str(e)
+            if job.attempts >= settings.IMAGE_JOB_MAX_ATTEMPTS:
+                job.status = 'Failed'
+            failed += 1
+        else:
+            job.status = 'Done'
+            job.date_processed = timezone.now()
+            done += 1
+        job.save(update_fields=['attempts', 'last_error', 'status', 'date_processed'])
+    return done, failed
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import COPEventApplication
+from .models import PostEventReport
+from .caching import content_version
+
+logger = logging.getLogger(__name__)
+
+EVENTS_TODAY_KEY = 'events_today'
+
+
+def _events_today(today):
+    reported = Exists(PostEventReport.objects.filter(event=OuterRef('pk')))
+    events = COPEventApplication.objects.for_listing().starting_on(today).annotate(reported=reported)
+    return [
+        {
+            'id': event.pk,
+            'title': event.proposed_title,
+            'organisation': event.org.user.name,
+            'event_type': event.event_type,
+            'status': event.status,
+            'start_time': event.start_time,
+            'end_time': event.end_time,
+            'reported': event.reported,
+        }
+        for event in events.order_by('start_time', 'id')
+    ]
+
+
+def schedule_message():
+    # The events-today list the dashboards show, as a ready-to-send SSE message
+    # and its id. Cached per content version and day, so every process and
+    # every listener shares one query per change.
+    close_old_connections()
+    today = timezone.localdate()
+    key = '%s:%s:%s' % (EVENTS_TODAY_KEY, content_version(), today)
+    message = cache.get(key)
+    if message is None:
+        data = json.dumps({'date': today, 'events': _events_today(today)}, cls=DjangoJSONEncoder)
+        digest = hashlib.md5(data.encode()).hexdigest()
+        message = (digest, 'id: %s\nevent: schedule\ndata: %s\n\n' % (digest, data))
+        cache.set(key, message, settings.PAGE_CACHE_TIMEOUT)
+    return message
+
+
+class ChangeFeed:
+    # One per process. While anyone is listening a single task checks the
+    # content version every LIVE_POLL_INTERVAL seconds and hands a changed
+    # schedule to every listener, so connected screens cost nothing per poll.
+    # With several processes CACHE_BACKEND must be shared for them to see each
+    # other's changes, as with the page cache.
+    def __init__(self):
+        self.listeners = set()
+        self.message = None
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=1)
+        self.listeners.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.listeners.discard(queue)
+
+    def publish(self, message):
+        self.message = message
+        for queue in self.listeners:
+            # A listener that has not caught up only needs the newest schedule
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def run(self):
+        while self.listeners:
+            try:
+                message = await sync_to_async(schedule_message)()
+            except Exception:
+                # A failed check is retried on the next tick
+                logger.exception('Could not load the events-today schedule')
+            else:
+                if message != self.message:
+                    self.publish(message)
+            await asyncio.sleep(settings.LIVE_POLL_INTERVAL)
+        # Whoever subscribes next starts from a fresh schedule
+        self.message = None
+
+
+feed = ChangeFeed()
+
+
+async def _stream(last_id):
+    queue = feed.subscribe()
+    # Proxies and clients that drop silently would otherwise keep a listener
+    # forever; EventSource reconnects on its own and resumes from Last-Event-ID
+    closes_at = time.monotonic() + settings.LIVE_STREAM_SECONDS
+    try:
+        yield 'retry: %d\n\n' % (settings.LIVE_RETRY * 1000)
+        if feed.message is not None and queue.empty():
+            queue.put_nowait(feed.message)
+        while True:
+            remaining = closes_at - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                digest, message = await asyncio.wait_for(
+                    queue.get(), min(settings.LIVE_HEARTBEAT, remaining),
+                )
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if digest != last_id:
+                last_id = digest
+                yield message
+    finally:
+        feed.unsubscribe(queue)
+
+
+async def events_today_stream(request):
+    # Server-Sent Events feed of today's schedule for the venue screens. Django
+    # 4.2's method decorators cannot wrap async views, hence the check here.
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    last_id = request.headers.get('Last-Event-ID')
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI a response cannot be held open cheaply: send the current
+        # schedule and let the browser reconnect after LIVE_RETRY seconds
+        digest, message = await sync_to_async(schedule_message)()
+        body = 'retry: %d\n\n' % (settings.LIVE_RETRY * 1000)
+        response = HttpResponse(body + (message if digest != last_id else ''), content_type='text/event-stream')
+    else:
+        response = StreamingHttpResponse(_stream(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,136 @@
+import base64
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import QueuedEmail
+from .queues import claim_due
+
+
+def _stored_attachment(attachment):
+    if not isinstance(attachment, tuple):
+        raise ValueError('Pre-built MIME attachments cannot be queued; attach (filename, content, mimetype) instead.')
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode()
+    return {'filename': filename, 'mimetype': mimetype, 'content': base64.b64encode(content).decode()}
+
+
+def queued_email_from_message(message):
+    # Everything the outbox cannot store raises ValueError, so a message is
+    # refused at send time rather than delivered with parts missing
+    if message.content_subtype != 'plain':
+        raise ValueError('Only plain-text bodies can be queued; add HTML with attach_alternative().')
+    html_body = None
+    for content, mimetype in getattr(message, 'alternatives', []):
+        if mimetype != 'text/html' or html_body is not None:
+            raise ValueError('Only one text/html alternative can be queued.')
+        html_body = content
+
+    return QueuedEmail(
+        subject=message.subject,
+        body=message.body,
+        html_body=html_body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+        attachments=[_stored_attachment(attachment) for attachment in message.attachments],
+    )
+
+
+def message_from_queued_email(queued, connection=None):
+    message = EmailMultiAlternatives(
+        queued.subject, queued.body, queued.from_email, queued.to,
+        cc=queued.cc, bcc=queued.bcc, connection=connection,
+        reply_to=queued.reply_to, headers=queued.headers,
+    )
+    if queued.html_body:
+        message.attach_alternative(queued.html_body, 'text/html')
+    for attachment in queued.attachments:
+        message.attach(attachment['filename'], base64.b64decode(attachment['content']), attachment['mimetype'])
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    # Stores messages in the outbox; the send_queued_mail command delivers them
+    def send_messages(self, email_messages):
+        queued = [queued_email_from_message(message) for message in email_messages]
+        QueuedEmail.objects.bulk_create(queued)
+        return len(queued)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.MAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim_queued_email(batch_size):
+    return claim_due(QueuedEmail, batch_size, settings.MAIL_OUTBOX_LEASE)
+
+
+class ConnectionLost(Exception):
+    pass
+
+
+def send_reconnecting(connection, build_message):
+    # The server may hang up mid-batch, e.g. after its per-connection message
+    # limit; reconnect once and resend. ConnectionLost means the server is
+    # gone and the rest of the batch should wait for the next run.
+    try:
+        build_message(connection).send()
+    except smtplib.SMTPServerDisconnected:
+        connection.close()
+        try:
+            connection.open()
+        except Exception as e:
+            raise ConnectionLost(e) from e
+        build_message(connection).send()
+
+
+def send_queued_email(queued, connection):
+    send_reconnecting(connection, lambda connection: message_from_queued_email(queued, connection))
+
+
+def dispatch_queued_email(batch_size=None):
+    batch = claim_queued_email(batch_size or settings.MAIL_OUTBOX_BATCH_SIZE)
+    sent = failed = 0
+    if not batch:
+        return sent, failed
+
+    connection = get_connection(settings.MAIL_DELIVERY_BACKEND)
+    try:
+        connection.open()
+    except Exception as e:
+        connection = None
+        open_error = e
+
+    for queued in batch:
+        try:
+            if connection is None:
+                raise open_error
+            send_queued_email(queued, connection)
+        except Exception as e:
+            queued.attempts += 1
+            queued.last_error = str(e)
+            if queued.attempts >= settings.MAIL_OUTBOX_MAX_ATTEMPTS:
+                queued.status = 'Failed'
+            else:
+                queued.next_attempt = timezone.now() + retry_delay(queued.attempts)
+            queued.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt'])
+            failed += 1
+        else:
+            queued.attempts += 1
+            queued.status = 'Sent'
+            queued.date_sent = timezone.now()
+            queued.save(update_fields=['attempts', 'status', 'date_sent'])
+            sent += 1
+
+    if connection is not None:
+        connection.close()
+    return sent, failed
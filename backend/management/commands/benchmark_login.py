@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher, identify_hasher
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.models import CustomUser
+
+EMAIL = 'login-benchmark@example.com'
+PASSWORD = 'benchmark password'
+
+
+def percentile(timings, point):
+    return statistics.quantiles(timings, n=100, method='inclusive')[point - 1]
+
+
+def timed_login():
+    started = time.perf_counter()
+    user = authenticate(None, username=EMAIL, password=PASSWORD)
+    elapsed = time.perf_counter() - started
+    if user is None:
+        raise RuntimeError('Benchmark login failed')
+    return user, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Time successful logins through EmailBackend and report p50/p99 latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=50, help='Logins timed after the first.')
+
+    def handle(self, *args, **options):
+        # The benchmark account only exists inside this transaction
+        with transaction.atomic():
+            user = CustomUser(email=EMAIL, name='Benchmark', role='Organisation')
+            # A hash from Django's stock hasher, as older accounts have
+            legacy = PBKDF2PasswordHasher()
+            user.password = legacy.encode(PASSWORD, legacy.salt())
+            user.save()
+
+            before = identify_hasher(user.password).algorithm
+            user, first = timed_login()
+            user.refresh_from_db()
+            after = identify_hasher(user.password)
+            self.stdout.write(
+                f'first login  {first * 1000:7.1f} ms  {before} -> {after.algorithm}'
+                f'{"" if after.must_update(user.password) else " (current profile)"}'
+            )
+
+            timings = [timed_login()[1] for _ in range(options['attempts'])]
+            self.stdout.write(
+                f'{get_hasher().algorithm:12} p50 {percentile(timings, 50) * 1000:7.1f} ms  '
+                f'p99 {percentile(timings, 99) * 1000:7.1f} ms  over {len(timings)} logins'
+            )
+            transaction.set_rollback(True)
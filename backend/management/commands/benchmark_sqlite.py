@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.database import apply_sqlite_pragmas
+
+# What a connection gets when no pragmas are set
+DEFAULT_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+def _writer(path, pragmas, rows, timeout, results):
+    # journal_mode is stored in the database file, so it is switched once by
+    # run_benchmark() rather than by every connection
+    pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+    written = locked = 0
+    for number in range(rows):
+        # A connection and a small transaction per row, like a registration
+        # request with the default CONN_MAX_AGE
+        connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        try:
+            apply_sqlite_pragmas(connection.cursor(), pragmas)
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT INTO registration (email, name) VALUES (?, ?)',
+                ('%s-%s@example.com' % (threading.get_ident(), number), 'Delegate'),
+            )
+            connection.execute('SELECT COUNT(*) FROM registration').fetchone()
+            connection.execute('COMMIT')
+            written += 1
+        except sqlite3.OperationalError:
+            locked += 1
+        finally:
+            connection.close()
+    results.append((written, locked))
+
+
+def run_benchmark(pragmas, writers, rows, timeout):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        setup = sqlite3.connect(path)
+        apply_sqlite_pragmas(setup.cursor(), pragmas)
+        setup.execute('CREATE TABLE registration (id INTEGER PRIMARY KEY, email TEXT UNIQUE, name TEXT)')
+        setup.close()
+
+        results = []
+        threads = [
+            threading.Thread(target=_writer, args=(path, pragmas, rows, timeout, results))
+            for _ in range(writers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    written = sum(result[0] for result in results)
+    locked = sum(result[1] for result in results)
+    return written, locked, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent SQLite write throughput with and without the SQLITE_PRAGMAS profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads.')
+        parser.add_argument('--rows', type=int, default=200, help='Rows inserted by each writer.')
+        parser.add_argument('--timeout', type=float, default=0.1,
+                            help='Seconds the sqlite3 driver waits on a lock when busy_timeout is unset.')
+
+    def handle(self, *args, **options):
+        profiles = [('default', DEFAULT_PRAGMAS), ('tuned', settings.SQLITE_PRAGMAS)]
+        for label, pragmas in profiles:
+            written, locked, elapsed = run_benchmark(
+                pragmas, options['writers'], options['rows'], options['timeout'],
+            )
+            self.stdout.write(
+                f'{label:8} {written} rows in {elapsed:.2f}s '
+                f'({written / elapsed:.0f} rows/s), {locked} "database is locked" errors'
+            )
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from django.core.management.base import BaseCommand
+
+# Memory costs tried, in KiB; 19 MiB is the smallest OWASP recommends for Argon2id
+MEMORY_COSTS = [19 * 1024, 32 * 1024, 64 * 1024, 128 * 1024, 256 * 1024]
+MAX_TIME_COST = 10
+
+
+def hash_time(time_cost, memory_cost, parallelism, rounds):
+    # Median seconds for one hash with these parameters
+    hasher = Argon2PasswordHasher()
+    hasher.time_cost, hasher.memory_cost, hasher.parallelism = time_cost, memory_cost, parallelism
+    salt = hasher.salt()
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.encode('calibration password', salt)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+class Command(BaseCommand):
+    help = 'Measure Argon2 on this host and suggest the strongest parameters that hash within a target time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250, help='Longest acceptable hash time.')
+        parser.add_argument('--parallelism', type=int, default=settings.PASSWORD_ARGON2_PARALLELISM,
+                            help='Lanes per hash; at most the cores a worker can spare.')
+        parser.add_argument('--rounds', type=int, default=5, help='Hashes timed per parameter set.')
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        parallelism = options['parallelism']
+        best = None
+        for memory_cost in MEMORY_COSTS:
+            # Hash time grows with time_cost, so stop at the first one over the target
+            for time_cost in range(1, MAX_TIME_COST + 1):
+                seconds = hash_time(time_cost, memory_cost, parallelism, options['rounds'])
+                self.stdout.write(f'memory {memory_cost // 1024:4} MiB  time {time_cost:2}  {seconds * 1000:7.1f} ms')
+                if seconds > target:
+                    break
+                if best is None or memory_cost * time_cost >= best[0] * best[1]:
+                    best = (memory_cost, time_cost, seconds)
+            if time_cost == 1 and seconds > target:
+                break
+
+        if best is None:
+            self.stderr.write(self.style.ERROR(
+                'No parameters hash within %.0f ms on this host; raise --target-ms.' % options['target_ms']
+            ))
+            return
+
+        memory_cost, time_cost, seconds = best
+        self.stdout.write(self.style.SUCCESS(f'Suggested profile ({seconds * 1000:.1f} ms per hash):'))
+        self.stdout.write(f'PASSWORD_ARGON2_MEMORY_COST={memory_cost}')
+        self.stdout.write(f'PASSWORD_ARGON2_TIME_COST={time_cost}')
+        self.stdout.write(f'PASSWORD_ARGON2_PARALLELISM={parallelism}')
@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from backend.images import IMAGE_FIELDS, dispatch_image_jobs, output_format, queue_image_jobs
+from backend.queues import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Resize, recompress and thumbnail uploaded images queued by the upload views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the queued images once and exit.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Images claimed per round.')
+        parser.add_argument('--backfill', action='store_true', help='Queue images uploaded before processing existed.')
+
+    def backfill(self):
+        _, extension = output_format()
+        queued = 0
+        for label, field, thumbnail in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            for instance in model.objects.exclude(**{field: ''}).exclude(**{'%s__isnull' % field: True}):
+                name = getattr(instance, field).name
+                if name.endswith(extension) and (thumbnail is None or getattr(instance, thumbnail)):
+                    continue
+                queue_image_jobs(instance, [field])
+                queued += 1
+        self.stdout.write(f'Queued {queued} existing images')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.backfill()
+        run_worker(self, dispatch_image_jobs, options, 'Processed %d, failed %d')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.broadcast import dispatch_broadcasts
+
+
+class Command(BaseCommand):
+    help = 'Send queued announcement broadcasts, resuming any that were interrupted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Send what is pending once and exit.')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to wait between checks.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                sent = dispatch_broadcasts()
+                if sent:
+                    self.stdout.write(f'Sent {sent} announcement emails')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from backend.mail import dispatch_queued_email
+from backend.queues import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Deliver emails waiting in the outbox, retrying failures with exponential backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due emails once and exit.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails claimed per round.')
+
+    def handle(self, *args, **options):
+        run_worker(self, dispatch_queued_email, options, 'Sent %d, failed %d')
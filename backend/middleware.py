@@ -1,29 +1,50 @@
 # middleware.py
-'''
+import time
+
 from django.conf import settings
+from django.contrib.auth import SESSION_KEY, logout
+
+from .routers import PIN_COOKIE, RoutingState, routing_state
 
-from datetime import datetime
 
 class SessionTimeoutMiddleware:
+    # Logs users out after SESSION_IDLE_TIMEOUT seconds without a request. The
+    # activity stamp is only rewritten once every SESSION_ACTIVITY_RESOLUTION
+    # seconds, so most page views leave the session unmodified and unsaved.
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        now = datetime.now()
+        session = request.session
+        # Anonymous visitors carry no activity stamp and skip the user lookup
+        if SESSION_KEY in session:
+            now = int(time.time())
+            last_activity = session.get('last_activity')
 
-        if 'last_activity' in request.session:
-            last_activity_str = request.session['last_activity']
-            
-            # Convert the stored string back to a datetime object
-            last_activity = datetime.strptime(last_activity_str, '%Y-%m-%d %H:%M:%S')
+            if last_activity is not None and now - last_activity > settings.SESSION_IDLE_TIMEOUT:
+                logout(request)
+            elif last_activity is None or now - last_activity >= settings.SESSION_ACTIVITY_RESOLUTION:
+                session['last_activity'] = now
 
-            if (now - last_activity).seconds > settings.SESSION_COOKIE_AGE:
-                # Session has timed out; log the user out
-                del request.session['user_id']  # Clear user data from the session
+        return self.get_response(request)
 
-        # Update the last activity timestamp for the user as a string
-        request.session['last_activity'] = now.strftime('%Y-%m-%d %H:%M:%S')
 
-        response = self.get_response(request)
+class ReplicaPinMiddleware:
+    # A visitor who just wrote keeps reading from the primary for
+    # REPLICA_PIN_SECONDS, so the page they are redirected to shows their change
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
         return response
-'''
\ No newline at end of file
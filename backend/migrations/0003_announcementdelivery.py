@@ -0,0 +1,33 @@
+# Generated by Django 4.2.6 on 2026-10-18 17:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_queuedemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Sent', 'Sent'), ('Failed', 'Failed')], default='Pending', max_length=20)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('date_sent', models.DateTimeField(blank=True, null=True)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='backend.copeventannouncement')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['announcement', 'status'], name='delivery_status_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='announcementdelivery',
+            constraint=models.UniqueConstraint(fields=('announcement', 'email'), name='unique_announcement_recipient'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.6 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0003_announcementdelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='copeventannouncement',
+            name='audience',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddIndex(
+            model_name='copeventapplication',
+            index=models.Index(fields=['status', 'org'], name='event_status_org_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='copparticipant',
+            index=models.Index(fields=['accreditation_type'], name='participant_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organisation',
+            index=models.Index(fields=['status'], name='organisation_status_idx'),
+        ),
+    ]
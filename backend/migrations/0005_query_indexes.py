@@ -0,0 +1,53 @@
+# Generated by Django 4.2.6 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_announcement_audience'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='queuedemail',
+            name='queued_email_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='announcementdelivery',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['announcement', 'id'], name='delivery_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='copeventapplication',
+            index=models.Index(fields=['start_time', 'id'], name='event_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='copeventapplication',
+            index=models.Index(fields=['date_created', 'id'], name='event_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='copparticipant',
+            index=models.Index(fields=['accredited_by'], name='participant_accredited_by_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['payment_status'], name='invoice_payment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organisation',
+            index=models.Index(fields=['organisation_type'], name='organisation_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organisation',
+            index=models.Index(fields=['date_created', 'id'], name='organisation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posteventreport',
+            index=models.Index(fields=['date_created', 'id'], name='report_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='queuedemail',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['next_attempt', 'id'], name='queued_email_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:01
+
+import backend.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0006_image_processing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='organisation',
+            name='certificate',
+            field=models.FileField(blank=True, null=True, upload_to='certificates/', validators=[backend.models.validate_document_size, django.core.validators.FileExtensionValidator(['pdf', 'jpg', 'jpeg', 'png', 'webp'])]),
+        ),
+    ]
@@ -1,6 +1,11 @@
+from datetime import datetime, time, timedelta
+
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
-from django.core.mail import send_mail
+from django.db.models import DurationField, Exists, ExpressionWrapper, F, OuterRef, Q
+from django.utils import timezone
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.core.validators import FileExtensionValidator
 from django.forms import ValidationError
 from django.urls import reverse
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -16,7 +21,13 @@ def validate_image_size(value):
 
     if file_size > max_size:
         raise ValidationError(_("The uploaded image is too large. The maximum file size is 2MB."))
-        
+
+def validate_document_size(value):
+    max_size = 5 * 1024 * 1024
+
+    if value.size > max_size:
+        raise ValidationError(_("The uploaded file is too large. The maximum file size is 5MB."))
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -53,19 +64,24 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name']
 
-    def send_verification_email(self, request):
+    def verification_message(self, domain):
         uid = urlsafe_base64_encode(force_bytes(self.pk))
         token = account_activation_token.make_token(self)
 
         mail_subject = 'Activate your account'
         message = render_to_string('account/verify.html', {
             'user': self,
-            'domain': request.get_host(),
+            'domain': domain,
             'uid': uid,
             'token': token,
         })
 
-        send_mail(mail_subject, message, 'no-reply@mhinnov8.com.ng', [self.email], html_message=message)
+        email = EmailMultiAlternatives(mail_subject, message, 'no-reply@mhinnov8.com.ng', [self.email])
+        email.attach_alternative(message, 'text/html')
+        return email
+
+    def send_verification_email(self, request):
+        self.verification_message(request.get_host()).send()
 
     def __str__(self):
         return self.email
@@ -84,6 +100,13 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.name
 
+class OrganisationQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('user').only(
+            'id', 'logo', 'logo_thumbnail', 'organisation_type', 'focus_area', 'state', 'status', 'date_created',
+            'user__id', 'user__name',
+        )
+
 class Organisation(models.Model):
     ORG_TYPE_CHOICES = [
         ('GO/MDAs', 'GO/MDAs'),
@@ -161,11 +184,22 @@ class Organisation(models.Model):
     focus_area = models.CharField(max_length=50, choices=FOCUS, null=True) 
     description = models.TextField(max_length=2500)
     logo = models.ImageField(upload_to='logos/', blank=True, null=True, validators=[validate_image_size])
-    certificate = models.FileField(upload_to='certificates/', blank=True, null=True, validators=[validate_image_size])
+    logo_thumbnail = models.ImageField(upload_to='thumbnails/logos/', blank=True, null=True, editable=False)
+    certificate = models.FileField(upload_to='certificates/', blank=True, null=True, validators=[
+        validate_document_size, FileExtensionValidator(['pdf', 'jpg', 'jpeg', 'png', 'webp'])])
     status = models.CharField(choices=STATUS_CHOICES, max_length=20, default='Pending')
     approved_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, blank=True, null=True, related_name='approval_officer')
     date_created = models.DateTimeField(auto_now_add=True)
 
+    objects = OrganisationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='organisation_status_idx'),
+            models.Index(fields=['organisation_type'], name='organisation_type_idx'),
+            models.Index(fields=['date_created', 'id'], name='organisation_created_idx'),
+        ]
+
     def __str__(self):
         return self.user.name
 
@@ -308,6 +342,13 @@ class AnnouncementImage(models.Model):
     def __str__(self):
         return self.announcement.title
 
+class COPParticipantQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('organization__user').only(
+            'id', 'name', 'email', 'accreditation_type', 'accreditation_number', 'not_listed',
+            'accredited_by', 'organization__id', 'organization__user__id', 'organization__user__name',
+        )
+
 class COPParticipant(models.Model):
     ACCREDITATION_CHOICES = [
         ('Party', 'Party'),
@@ -326,6 +367,14 @@ class COPParticipant(models.Model):
     accredited_by = models.CharField(max_length=500, default='NCCC')
     cop_year = models.DateField(auto_now_add=True)
 
+    objects = COPParticipantQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['accreditation_type'], name='participant_type_idx'),
+            models.Index(fields=['accredited_by'], name='participant_accredited_by_idx'),
+        ]
+
     def send_verification(self, request):
         uid = urlsafe_base64_encode(force_bytes(self.pk))
         token = account_activation_token.make_token(self)
@@ -343,6 +392,31 @@ class COPParticipant(models.Model):
     def __str__(self):
         return self.name
 
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+EVENT_DURATION = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+
+class COPEventApplicationQuerySet(models.QuerySet):
+    def reported(self):
+        # Exists() rather than a join so events with several reports are counted once
+        return self.filter(Exists(PostEventReport.objects.filter(event=OuterRef('pk'))))
+
+    # Plain ranges on start_time instead of __date lookups, which wrap the
+    # column in a function and so cannot use event_start_idx
+    def starting_on(self, day):
+        start = day_start(day)
+        return self.filter(start_time__gte=start, start_time__lt=start + timedelta(days=1))
+
+    def starting_from(self, day):
+        return self.filter(start_time__gte=day_start(day))
+
+    def for_listing(self):
+        return self.select_related('org__user').only(
+            'id', 'proposed_title', 'event_type', 'number_of_speakers', 'start_time', 'end_time',
+            'status', 'date_created', 'org__id', 'org__user__id', 'org__user__name',
+        )
+
 class COPEventApplication(models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
@@ -365,6 +439,15 @@ class COPEventApplication(models.Model):
     flier = models.ImageField(upload_to='fliers/', blank=True, null=True, validators=[validate_image_size])
     date_created = models.DateTimeField(auto_now_add=True)
 
+    objects = COPEventApplicationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'org'], name='event_status_org_idx'),
+            models.Index(fields=['start_time', 'id'], name='event_start_idx'),
+            models.Index(fields=['date_created', 'id'], name='event_created_idx'),
+        ]
+
     def __str__(self):
         return self.proposed_title
     
@@ -396,20 +479,68 @@ class Invoice(models.Model):
     proof = models.ImageField(upload_to='reciepts/', blank=True, null=True, validators=[validate_image_size])
     date_created = models.DateTimeField(auto_now_add=True, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['payment_status'], name='invoice_payment_status_idx'),
+        ]
+
     def __str__(self):
         return self.application.proposed_title
 
 
 class COPEventAnnouncement(models.Model):
+    AUDIENCE_CHOICES = [
+        ('all', 'All users'),
+        ('approved_organisations', 'Approved organisations'),
+        ('event_hosts', 'Hosts of approved side events'),
+    ] + [
+        ('delegates:%s' % value, '%s delegates' % label)
+        for value, label in COPParticipant.ACCREDITATION_CHOICES
+    ]
     subject = models.CharField(max_length=500)
     message = models.TextField()
     sender = models.CharField(max_length=50)
+    audience = models.JSONField(default=list, blank=True)
     date_created = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.subject
+
+
+class AnnouncementDelivery(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+    announcement = models.ForeignKey(COPEventAnnouncement, on_delete=models.CASCADE, related_name='deliveries')
+    email = models.EmailField()
+    name = models.CharField(max_length=100, blank=True)
+    status = models.CharField(choices=STATUS_CHOICES, max_length=20, default='Pending')
+    error = models.TextField(blank=True, null=True)
+    date_sent = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['announcement', 'email'], name='unique_announcement_recipient'),
+        ]
+        indexes = [
+            models.Index(fields=['announcement', 'status'], name='delivery_status_idx'),
+            models.Index(fields=['announcement', 'id'], condition=Q(status='Pending'), name='delivery_pending_idx'),
+        ]
+
+    def __str__(self):
+        return self.email
     
     
+class PostEventReportQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('event__org__user').only(
+            'id', 'date_created', 'event__id', 'event__proposed_title', 'event__number_of_speakers',
+            'event__start_time', 'event__end_time', 'event__org__id', 'event__org__user__id',
+            'event__org__user__name',
+        )
+
 class PostEventReport(models.Model):
     event = models.ForeignKey(COPEventApplication, on_delete=models.CASCADE)
     description = models.TextField(max_length=5000, null=True)
@@ -417,5 +548,73 @@ class PostEventReport(models.Model):
     video_url = models.URLField(blank=True, null=True)
     date_created = models.DateField(auto_now_add=True)
 
+    objects = PostEventReportQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_created', 'id'], name='report_created_idx'),
+        ]
+
     def __str__(self):
         return self.event.proposed_title
+
+
+class QueuedEmail(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=998)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    # [{'filename', 'mimetype', 'content' (base64)}, ...]
+    attachments = models.JSONField(default=list, blank=True)
+    status = models.CharField(choices=STATUS_CHOICES, max_length=20, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_sent = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt', 'id'], condition=Q(status='Pending'), name='queued_email_pending_idx'),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+
+class ImageJob(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed'),
+    ]
+    # The upload is identified by model label, row and field so one queue
+    # serves every image field listed in backend.images.IMAGE_FIELDS
+    model_label = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    field = models.CharField(max_length=100)
+    name = models.CharField(max_length=255)
+    status = models.CharField(choices=STATUS_CHOICES, max_length=20, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_processed = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt', 'id'], condition=Q(status='Pending'), name='image_job_pending_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
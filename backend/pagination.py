@@ -0,0 +1,121 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder trims datetimes to milliseconds, which would make the
+    # cursor skip rows created within the same millisecond
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values, direction):
+    data = json.dumps({'k': values, 'd': direction}, cls=CursorEncoder)
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, fields):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(fields, data['k'])
+        ]
+        direction = data['d']
+    except (ValueError, KeyError, TypeError, ValidationError):
+        return None, None
+
+    if len(values) != len(fields) or direction not in ('next', 'prev'):
+        return None, None
+    return values, direction
+
+
+def _seek_filter(ordering, values, reverse):
+    # Builds (a > x) OR (a = x AND b > y) ... for the given ordering
+    condition = Q()
+    equal = Q()
+    for order, value in zip(ordering, values):
+        name = order.lstrip('-')
+        descending = order.startswith('-') != reverse
+        lookup = '%s__%s' % (name, 'lt' if descending else 'gt')
+        condition |= equal & Q(**{lookup: value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reverse_ordering(ordering):
+    return [order[1:] if order.startswith('-') else '-' + order for order in ordering]
+
+
+# ordering must end in a unique column (normally id) and none of its columns
+# may be nullable. Pages seek past the cursor row, so no OFFSET or COUNT(*) is
+# issued however deep the page is.
+def keyset_paginate(request, queryset, ordering, page_size=None):
+    page_size = page_size or settings.LIST_PAGE_SIZE
+    fields = [order.lstrip('-') for order in ordering]
+
+    values, direction = None, None
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values, direction = decode_cursor(cursor, queryset.model, fields)
+
+    backwards = direction == 'prev'
+    rows = queryset.order_by(*(_reverse_ordering(ordering) if backwards else ordering))
+    if values is not None:
+        rows = rows.filter(_seek_filter(ordering, values, backwards))
+
+    rows = list(rows[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def key(obj):
+        return [getattr(obj, name) for name in fields]
+
+    if backwards:
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, values is not None
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(key(rows[-1]), 'next')
+    if rows and has_previous:
+        prev_cursor = encode_cursor(key(rows[0]), 'prev')
+
+    return KeysetPage(rows, next_cursor, prev_cursor)
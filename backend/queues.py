@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+
+def claim_due(model, batch_size, lease):
+    # Claimed rows are leased by pushing next_attempt forward `lease` seconds,
+    # so a second worker skips them and a crashed one's rows come back after
+    # the lease. `model` needs status and next_attempt columns.
+    now = timezone.now()
+    with transaction.atomic():
+        due = model.objects.select_for_update(skip_locked=True).filter(
+            status='Pending', next_attempt__lte=now,
+        ).order_by('next_attempt', 'id')
+        batch = list(due[:batch_size])
+        model.objects.filter(pk__in=[row.pk for row in batch]).update(
+            next_attempt=now + timedelta(seconds=lease),
+        )
+    return batch
+
+
+def run_worker(command, dispatch, options, report):
+    # Shared loop of the queue commands: dispatch until the queue is empty,
+    # then exit with --once or sleep --interval seconds and look again.
+    # `report` formats the (done, failed) counts dispatch returns.
+    try:
+        while True:
+            done, failed = dispatch(options['batch_size'])
+            if done or failed:
+                command.stdout.write(report % (done, failed))
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['interval'])
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,76 @@
+import contextvars
+import time
+from functools import wraps
+
+from django.conf import settings
+
+from .caching import content_modified
+
+PRIMARY_DATABASE = 'default'
+REPLICA_DATABASE = 'replica'
+PIN_COOKIE = 'db_pin'
+
+# Sessions decide who is logged in, so they are never read from a lagging copy
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.use_replica = False
+        self.wrote = False
+
+
+# Set per request by backend.middleware.ReplicaPinMiddleware
+routing_state = contextvars.ContextVar('routing_state', default=None)
+
+
+def content_settling():
+    # True while the replica may still lack the latest change. Pages and stats
+    # built now are cached under the new content version for minutes, so they
+    # must not be filled from a replica that has not caught up.
+    return time.time() - content_modified() < settings.REPLICA_PIN_SECONDS
+
+
+def read_from_replica(view):
+    # Reads made by the view go to the replica unless the visitor wrote
+    # recently or anyone changed content within REPLICA_PIN_SECONDS
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = routing_state.get()
+        if state is None or REPLICA_DATABASE not in settings.DATABASES or content_settling():
+            return view(request, *args, **kwargs)
+        state.use_replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.use_replica = False
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        if (
+            state is not None
+            and state.use_replica
+            and not (state.pinned or state.wrote)
+            and REPLICA_DATABASE in settings.DATABASES
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            return REPLICA_DATABASE
+        return PRIMARY_DATABASE
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema from the primary
+        return db != REPLICA_DATABASE
@@ -0,0 +1,43 @@
+from django.db.backends.signals import connection_created
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import COPEventApplication
+from .models import COPParticipant
+from .models import Organisation
+from .models import PostEventReport
+from .caching import invalidate_content
+from .database import configure_sqlite
+from .images import IMAGE_FIELDS, image_fields, queue_image_jobs
+
+
+def refresh_cached_content(sender, **kwargs):
+    invalidate_content()
+
+
+for model in (COPEventApplication, PostEventReport, COPParticipant, Organisation):
+    post_save.connect(refresh_cached_content, sender=model, dispatch_uid='content_save_%s' % model.__name__)
+    post_delete.connect(refresh_cached_content, sender=model, dispatch_uid='content_delete_%s' % model.__name__)
+
+connection_created.connect(configure_sqlite, dispatch_uid='configure_sqlite')
+
+
+def note_new_images(sender, instance, **kwargs):
+    # A freshly assigned upload is uncommitted until the field saves it
+    instance._new_images = [
+        field for field, _ in image_fields(sender)
+        if getattr(instance, field) and not getattr(instance, field)._committed
+    ]
+
+
+def queue_new_images(sender, instance, **kwargs):
+    new_images = getattr(instance, '_new_images', None)
+    if new_images:
+        queue_image_jobs(instance, new_images)
+        instance._new_images = []
+
+
+for label in {model_label for model_label, _, _ in IMAGE_FIELDS}:
+    model = apps.get_model(label)
+    pre_save.connect(note_new_images, sender=model, dispatch_uid='note_images_%s' % label)
+    post_save.connect(queue_new_images, sender=model, dispatch_uid='queue_images_%s' % label)
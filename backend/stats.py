@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+
+from .models import EVENT_DURATION
+from .models import COPEventApplication
+from .models import COPParticipant
+from .models import Organisation
+from .models import PostEventReport
+from .caching import content_version, record
+
+STATS_CACHE_KEY = 'cop_stats'
+
+
+def _compute_stats(org=None):
+    events = COPEventApplication.objects.all()
+    reports = PostEventReport.objects.all()
+    if org is not None:
+        events = events.filter(org=org)
+        reports = reports.filter(event__org=org)
+
+    totals = events.aggregate(side_events=Count('id', filter=Q(status='Approved')))
+    # reported() keeps events with several reports from being counted twice
+    totals.update(events.reported().aggregate(
+        total_speakers=Sum('number_of_speakers'),
+        host=Count('org', distinct=True),
+        total_duration=Sum(EVENT_DURATION),
+    ))
+
+    duration = totals['total_duration']
+    stats = {
+        'side_events': totals['side_events'],
+        'total_speakers': totals['total_speakers'] or 0,
+        'host': totals['host'],
+        'total_duration': duration.total_seconds() / 3600 if duration else 0,
+        'session': reports.count(),
+    }
+
+    if org is None:
+        stats['delegates'] = COPParticipant.objects.count()
+        stats['organisations'] = Organisation.objects.count()
+
+    return stats
+
+
+def get_cop_stats(org=None):
+    scope = org.pk if org is not None else 'all'
+    key = '%s:%s:%s' % (STATS_CACHE_KEY, content_version(), scope)
+
+    stats = cache.get(key)
+    if stats is None:
+        record('stats', 'miss')
+        stats = _compute_stats(org)
+        cache.set(key, stats, settings.COP_STATS_TIMEOUT)
+    else:
+        record('stats', 'hit')
+    return stats
@@ -1,3 +1,802 @@
-from django.test import TestCase
+import io
+import re
+import shutil
+import smtplib
+import tempfile
+import time
+from datetime import timedelta
+from email.mime.image import MIMEImage
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import MD5PasswordHasher, PBKDF2PasswordHasher, make_password
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage, EmailMultiAlternatives, send_mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from .broadcast import announcement_recipients, send_broadcast
+from .caching import cache_counters, invalidate_content
+from .checks import shared_cache_check
+from .images import dispatch_image_jobs
+from .mail import claim_queued_email, dispatch_queued_email
+from .models import AnnouncementDelivery
+from .models import COPEventAnnouncement
+from .models import COPEventApplication
+from .models import COPParticipant
+from .models import CustomUser
+from .models import ImageJob
+from .models import Organisation
+from .models import PostEventReport
+from .models import QueuedEmail
+from .pagination import encode_cursor, keyset_paginate
+from .routers import ReplicaRouter, RoutingState, read_from_replica, routing_state
+from .stats import get_cop_stats
+from .uploads import INVALID_IMAGE, LimitedUploadHandler, RejectedUpload
+
+
+def make_organisation(email, **fields):
+    user = CustomUser.objects.create_user(email=email, password='x', name=email.split('@')[0], role='Organisation')
+    defaults = {'organisation_type': 'NGO/iNGO', 'contact_number': 1, 'address_line': 'Abuja', 'state': 'FCT', 'description': 'd'}
+    return Organisation.objects.create(user=user, **{**defaults, **fields})
+
+
+def make_event(org, start=None, hours=1, speakers=2, status='Approved', title='Plenary'):
+    start = start or timezone.now()
+    return COPEventApplication.objects.create(
+        org=org, proposed_title=title, number_of_speakers=speakers,
+        start_time=start, end_time=start + timedelta(hours=hours), status=status,
+    )
+
+
+class FlakyEmailBackend(EmailBackend):
+    # locmem backend whose server rejects bad@ addresses and hangs up once on drop@
+    opened = 0
+    dropped = False
+
+    def open(self):
+        FlakyEmailBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].startswith('bad@'):
+                raise smtplib.SMTPDataError(554, b'Rejected')
+            if message.to[0].startswith('drop@') and not FlakyEmailBackend.dropped:
+                FlakyEmailBackend.dropped = True
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+class DeadEmailBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+
+@override_settings(MAIL_DELIVERY_BACKEND='backend.tests.FlakyEmailBackend', BROADCAST_THROTTLE=0, BROADCAST_CHUNK_SIZE=2)
+class BroadcastTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.opened = 0
+        FlakyEmailBackend.dropped = False
+        self.announcement = COPEventAnnouncement.objects.create(subject='Plenary', message='Moved to hall B', sender='COP')
+
+    def deliver_to(self, *emails):
+        AnnouncementDelivery.objects.bulk_create([
+            AnnouncementDelivery(announcement=self.announcement, email=email) for email in emails
+        ])
+
+    def statuses(self):
+        return dict(self.announcement.deliveries.values_list('email', 'status'))
+
+    def test_failed_recipient_does_not_block_the_rest(self):
+        self.deliver_to('a@x.com', 'bad@x.com', 'b@x.com')
+        self.assertEqual(send_broadcast(self.announcement), 2)
+        self.assertEqual(self.statuses(), {'a@x.com': 'Sent', 'bad@x.com': 'Failed', 'b@x.com': 'Sent'})
+        self.assertIn('Rejected', self.announcement.deliveries.get(email='bad@x.com').error)
+
+    def test_reconnects_after_disconnect(self):
+        self.deliver_to('a@x.com', 'drop@x.com', 'b@x.com')
+        self.assertEqual(send_broadcast(self.announcement), 3)
+        self.assertEqual(FlakyEmailBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_unknown_audience_is_refused(self):
+        CustomUser.objects.create_user(email='a@x.com', password='x')
+        self.announcement.audience = ['delegates:Party', 'approved_organisation']
+        with self.assertRaises(ValueError):
+            list(announcement_recipients(self.announcement))
+
+    @override_settings(MAIL_DELIVERY_BACKEND='backend.tests.DeadEmailBackend')
+    def test_unreachable_server_leaves_deliveries_pending(self):
+        self.deliver_to('a@x.com')
+        self.assertEqual(send_broadcast(self.announcement), 0)
+        self.assertEqual(self.statuses(), {'a@x.com': 'Pending'})
+
+
+class ListQueryCountTests(TestCase):
+    # Each list page must cost the same number of queries however many rows it shows
+    paths = ['/organisations/', '/accreditation/', '/side_event/', '/event_list/', '/report_list']
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(email='admin@x.com', password='x', name='Admin', role='Admin')
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        start = timezone.now() + timedelta(days=1)
+        for number in range(self.rows, self.rows + count):
+            org = make_organisation(
+                'org%d@x.com' % number, logo='logos/%d.png' % number, logo_thumbnail='thumbnails/logos/%d.webp' % number,
+            )
+            event = make_event(org, start, title='Event %d' % number)
+            PostEventReport.objects.create(event=event, description='r')
+            delegate = CustomUser.objects.create_user(email='delegate%d@x.com' % number, password='x')
+            COPParticipant.objects.create(
+                user=delegate, accreditation_type='Party', accreditation_number=str(number),
+                name='Delegate %d' % number, email=delegate.email, organization=org,
+            )
+        self.rows += count
+
+    def query_count(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_rows(2)
+        for path in self.paths:
+            self.client.get(path)
+        counts = {path: self.query_count(path) for path in self.paths}
+
+        self.add_rows(8)
+        for path in self.paths:
+            with self.subTest(path=path), self.assertNumQueries(counts[path]):
+                self.assertEqual(self.client.get(path).status_code, 200)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Plans are read in SQLite EXPLAIN QUERY PLAN format')
+class QueryPlanTests(TestCase):
+    # The list, dashboard and dispatcher queries must be answered from their
+    # indexes; a plain "SCAN <table>" line means a full table scan
+    def assertUsesIndex(self, queryset, *indexes):
+        plan = queryset.explain()
+        self.assertRegex(plan, r'USING INDEX (%s)\b' % '|'.join(indexes))
+        self.assertNotRegex(plan, r'SCAN \w+\s*($|\n)')
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_query_plans(self):
+        today = timezone.localdate()
+        now = timezone.now()
+        announcement = COPEventAnnouncement.objects.create(subject='s', message='m', sender='COP')
+        cases = [
+            (COPEventApplication.objects.for_listing().starting_on(today), 'event_start_idx'),
+            (COPEventApplication.objects.for_listing().starting_from(today).order_by('start_time', 'id')[:51], 'event_start_idx'),
+            (COPEventApplication.objects.for_listing().order_by('-date_created', '-id')[:51], 'event_created_idx'),
+            (COPEventApplication.objects.filter(status='Approved'), 'event_status_org_idx'),
+            (Organisation.objects.for_listing().order_by('-date_created', '-id')[:51], 'organisation_created_idx'),
+            (Organisation.objects.filter(organisation_type='GO/MDAs'), 'organisation_type_idx'),
+            (PostEventReport.objects.for_listing().order_by('-date_created', '-id')[:51], 'report_created_idx'),
+            (COPParticipant.objects.filter(accredited_by='NCCC'), 'participant_accredited_by_idx'),
+            (QueuedEmail.objects.filter(status='Pending', next_attempt__lte=now).order_by('next_attempt', 'id'), 'queued_email_pending_idx'),
+            (ImageJob.objects.filter(status='Pending', next_attempt__lte=now).order_by('next_attempt', 'id'), 'image_job_pending_idx'),
+            # Either delivery index returns the rows in id order
+            (announcement.deliveries.filter(status='Pending').order_by('id'), 'delivery_pending_idx', 'delivery_status_idx'),
+        ]
+        for queryset, *indexes in cases:
+            with self.subTest(index=indexes[0], query=str(queryset.query)[:80]):
+                self.assertUsesIndex(queryset, *indexes)
+
+
+class DelegateImportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(CustomUser.objects.create_user(email='admin@x.com', password='x', name='Admin', role='Admin'))
+
+    def upload(self, name, content):
+        return self.client.post('/accreditation/', {'delegate_file': SimpleUploadedFile(name, content)})
+
+    def test_non_utf8_csv_is_a_form_error(self):
+        content = 'accreditation_type,accreditation_number,name,email\nParty,1,Zoë,z@x.com\n'.encode('cp1252')
+        response = self.upload('delegates.csv', content)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('not UTF-8 encoded', response.context['import_form'].errors['delegate_file'][0])
+
+    def test_corrupt_xlsx_is_a_form_error(self):
+        response = self.upload('delegates.xlsx', b'not a workbook')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('not a valid XLSX', response.context['import_form'].errors['delegate_file'][0])
+
+    def test_long_name_is_a_row_error(self):
+        long_name = 'Delegate ' + 'x' * 40
+        content = 'accreditation_type,accreditation_number,name,email\nParty,1,%s,a@x.com\nParty,2,Short,b@x.com\n' % long_name
+        response = self.upload('delegates.csv', content.encode())
+        errors = response.context['import_result'].errors
+        self.assertEqual([row for row, _ in errors], [2])
+        self.assertIn('at most 30 characters', errors[0][1])
+        self.assertFalse(CustomUser.objects.filter(email='a@x.com').exists())
+        self.assertEqual(CustomUser.objects.get(email='b@x.com').name, 'Short')
+
+    def test_new_delegate_sets_a_password_from_the_welcome_link(self):
+        cache.clear()
+        content = 'accreditation_type,accreditation_number,name,email\nParty,1,Delegate,d@x.com\n'
+        self.upload('delegates.csv', content.encode())
+        delegate = CustomUser.objects.get(email='d@x.com')
+        self.assertFalse(delegate.has_usable_password())
+        self.assertFalse(delegate.is_verified)
+
+        self.assertEqual([message.to for message in mail.outbox], [['d@x.com']])
+        link = re.search(r'/password_reset_confirm/[^/]+/[^/]+/', mail.outbox[0].body).group(0)
+        self.client.logout()
+        self.assertContains(self.client.get(link), 'new_password1')
+        response = self.client.post(link, {'new_password1': 'Lagos-Abuja-2024', 'new_password2': 'Lagos-Abuja-2024'})
+        self.assertRedirects(response, '/login/', fetch_redirect_response=False)
+
+        delegate.refresh_from_db()
+        self.assertTrue(delegate.is_verified)
+        self.client.post('/login/', {'username': 'd@x.com', 'password': 'Lagos-Abuja-2024'})
+        self.assertEqual(self.client.session['_auth_user_id'], str(delegate.pk))
+
+        self.client.logout()
+        self.assertContains(self.client.get(link), 'Password reset link is invalid!')
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.token = routing_state.set(RoutingState())
+        self.addCleanup(routing_state.reset, self.token)
+        databases = mock.patch.dict(settings.DATABASES, {'replica': settings.DATABASES['default']})
+        databases.start()
+        self.addCleanup(databases.stop)
+
+    def read_alias(self):
+        @read_from_replica
+        def view(request):
+            return ReplicaRouter().db_for_read(Organisation)
+        return view(None)
+
+    def test_reads_use_replica_once_content_has_settled(self):
+        with mock.patch('backend.routers.time.time', return_value=time.time() + settings.REPLICA_PIN_SECONDS + 1):
+            self.assertEqual(self.read_alias(), 'replica')
+
+    def test_reads_stay_on_primary_right_after_a_change(self):
+        invalidate_content()
+        self.assertEqual(self.read_alias(), 'default')
+
+
+class ApiConditionalGetTests(TestCase):
+    def test_unchanged_poll_returns_304_without_queries(self):
+        first = self.client.get('/api/v1/events/')
+        with self.assertNumQueries(0):
+            again = self.client.get('/api/v1/events/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        invalidate_content()
+        self.assertEqual(self.client.get('/api/v1/events/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+class SharedCacheCheckTests(TestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    FILE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/x'}}
+
+    def warnings(self):
+        return [warning.id for warning in shared_cache_check(None)]
+
+    def test_private_cache_with_several_workers_is_flagged(self):
+        with self.settings(WEB_CONCURRENCY=2, CACHES=self.LOCMEM):
+            self.assertEqual(self.warnings(), ['backend.W001'])
+
+    def test_shared_cache_or_single_worker_passes(self):
+        with self.settings(WEB_CONCURRENCY=2, CACHES=self.FILE):
+            self.assertEqual(self.warnings(), [])
+        with self.settings(WEB_CONCURRENCY=1, CACHES=self.LOCMEM):
+            self.assertEqual(self.warnings(), [])
+
+
+@override_settings(
+    EMAIL_BACKEND='backend.mail.QueuedEmailBackend',
+    MAIL_DELIVERY_BACKEND='backend.tests.FlakyEmailBackend',
+    MAIL_OUTBOX_RETRY_DELAY=60,
+    MAIL_OUTBOX_LEASE=300,
+)
+class QueuedEmailTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.opened = 0
+        FlakyEmailBackend.dropped = False
+
+    def queue(self, *recipients):
+        for recipient in recipients:
+            send_mail('Accreditation', 'Welcome', 'no-reply@x.com', [recipient])
+
+    def test_send_mail_is_queued_not_sent(self):
+        self.queue('a@x.com')
+        self.assertEqual(mail.outbox, [])
+        queued = QueuedEmail.objects.get()
+        self.assertEqual((queued.to, queued.status), (['a@x.com'], 'Pending'))
+
+    def test_dispatch_sends_and_marks_sent(self):
+        self.queue('a@x.com', 'b@x.com')
+        self.assertEqual(dispatch_queued_email(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@x.com', 'b@x.com'])
+        self.assertFalse(QueuedEmail.objects.exclude(status='Sent').exists())
+
+    def test_worker_command_drains_the_outbox_once(self):
+        self.queue('a@x.com', 'b@x.com')
+        out = io.StringIO()
+        call_command('send_queued_mail', once=True, stdout=out)
+        self.assertEqual(out.getvalue(), 'Sent 2, failed 0\n')
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failure_is_retried_with_backoff(self):
+        self.queue('bad@x.com')
+        before = timezone.now()
+        self.assertEqual(dispatch_queued_email(), (0, 1))
+        queued = QueuedEmail.objects.get()
+        self.assertEqual((queued.status, queued.attempts), ('Pending', 1))
+        self.assertGreaterEqual(queued.next_attempt, before + timedelta(seconds=60))
+
+        # Not due again until the delay passes; the second delay is doubled
+        self.assertEqual(dispatch_queued_email(), (0, 0))
+        with mock.patch('backend.mail.timezone.now', return_value=queued.next_attempt + timedelta(seconds=1)):
+            self.assertEqual(dispatch_queued_email(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 2)
+        self.assertGreaterEqual(queued.next_attempt, timezone.now() + timedelta(seconds=119))
+
+    def test_expired_lease_is_reclaimed(self):
+        self.queue('a@x.com')
+        # A worker claims the batch and dies before sending
+        self.assertEqual(len(claim_queued_email(10)), 1)
+        self.assertEqual(claim_queued_email(10), [])
+
+        later = timezone.now() + timedelta(seconds=301)
+        with mock.patch('backend.mail.timezone.now', return_value=later):
+            self.assertEqual(dispatch_queued_email(), (1, 0))
+        self.assertEqual(QueuedEmail.objects.get().status, 'Sent')
+
+    def test_attachments_reply_to_and_headers_survive_the_queue(self):
+        message = EmailMultiAlternatives('Invoice', 'Attached', 'no-reply@x.com', ['a@x.com'],
+                                         reply_to=['finance@x.com'], headers={'X-Tag': 'invoice'})
+        message.attach_alternative('<p>Attached</p>', 'text/html')
+        message.attach('invoice.pdf', b'%PDF-1.4 binary \xff', 'application/pdf')
+        message.send()
+        self.assertEqual(dispatch_queued_email(), (1, 0))
+
+        sent = mail.outbox[0]
+        self.assertEqual(sent.attachments, [('invoice.pdf', b'%PDF-1.4 binary \xff', 'application/pdf')])
+        self.assertEqual(sent.reply_to, ['finance@x.com'])
+        self.assertEqual(sent.extra_headers, {'X-Tag': 'invoice'})
+        self.assertEqual(sent.alternatives, [('<p>Attached</p>', 'text/html')])
+
+    def test_parts_the_queue_cannot_store_are_refused(self):
+        message = EmailMessage('Logo', 'See attached', 'no-reply@x.com', ['a@x.com'])
+        message.attach(MIMEImage(b'GIF89a', 'gif'))
+        with self.assertRaises(ValueError):
+            message.send()
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_reconnects_after_disconnect(self):
+        self.queue('a@x.com', 'drop@x.com', 'b@x.com')
+        self.assertEqual(dispatch_queued_email(), (3, 0))
+        self.assertEqual(FlakyEmailBackend.opened, 2)
+
+
+class LiveScheduleTests(TestCase):
+    def setUp(self):
+        self.event = make_event(make_organisation('org@x.com'))
+
+    def test_wsgi_fallback_sends_schedule_once(self):
+        response = self.client.get('/live/events-today/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('retry: %d\n\n' % (settings.LIVE_RETRY * 1000)))
+        self.assertIn('event: schedule\n', body)
+        self.assertIn('"title": "Plenary"', body)
+
+        last_id = re.search(r'^id: (\w+)$', body, re.M).group(1)
+        again = self.client.get('/live/events-today/', HTTP_LAST_EVENT_ID=last_id)
+        self.assertEqual(again.content.decode(), 'retry: %d\n\n' % (settings.LIVE_RETRY * 1000))
+
+        self.event.status = 'Declined'
+        self.event.save()
+        changed = self.client.get('/live/events-today/', HTTP_LAST_EVENT_ID=last_id).content.decode()
+        self.assertIn('"status": "Declined"', changed)
+
+    def test_only_screens_opened_with_live_subscribe(self):
+        self.assertNotContains(self.client.get('/'), 'EventSource')
+        self.assertContains(self.client.get('/?live=1'), 'EventSource')
+
+
+class OrganisationViewTests(TestCase):
+    def test_pages_without_a_profile_redirect_to_registration(self):
+        user = CustomUser.objects.create_user(email='new@x.com', password='x', name='New', role='Organisation')
+        self.client.force_login(user)
+        for path in ['/org_dashbord', '/org_event/', '/org_update/']:
+            with self.subTest(path=path):
+                self.assertRedirects(self.client.get(path), '/org_profile/')
+
+
+class StatsTests(TestCase):
+    def test_event_with_several_reports_counts_once(self):
+        org = make_organisation('org@x.com')
+        other = make_organisation('other@x.com')
+        event = make_event(org, hours=2, speakers=3)
+        PostEventReport.objects.create(event=event, description='day one')
+        PostEventReport.objects.create(event=event, description='day two')
+        make_event(other, hours=1, speakers=4)
+
+        for stats in (get_cop_stats(), get_cop_stats(org)):
+            self.assertEqual(stats['total_speakers'], 3)
+            self.assertEqual(stats['total_duration'], 2)
+            self.assertEqual(stats['host'], 1)
+            self.assertEqual(stats['session'], 2)
+        self.assertEqual(get_cop_stats(other)['total_duration'], 0)
+
+    def test_matches_the_figures_the_views_used_to_compute(self):
+        # The per-view queries the snapshot replaced, for data with one report per event
+        orgs = [make_organisation('org%d@x.com' % number) for number in range(3)]
+        for number, org in enumerate(orgs):
+            reported = make_event(org, hours=number + 1, speakers=number + 2)
+            PostEventReport.objects.create(event=reported, description='r')
+            make_event(org, status='Pending')
+        user = CustomUser.objects.create_user(email='d@x.com', password='x')
+        COPParticipant.objects.create(user=user, accreditation_type='Party', accreditation_number='1',
+                                      name='D', email='d@x.com', organization=orgs[0])
+
+        reported = COPEventApplication.objects.filter(posteventreport__isnull=False)
+        duration = sum((event.end_time - event.start_time for event in reported), timedelta())
+        expected = {
+            'side_events': COPEventApplication.objects.filter(status='Approved').count(),
+            'total_speakers': sum(event.number_of_speakers for event in reported),
+            'host': reported.values('org').annotate(Count('org')).count(),
+            'total_duration': duration.total_seconds() / 3600,
+            'session': PostEventReport.objects.filter(event__isnull=False).count(),
+            'delegates': COPParticipant.objects.count(),
+            'organisations': Organisation.objects.count(),
+        }
+        self.assertEqual(get_cop_stats(), expected)
+
+    def test_changes_to_each_model_refresh_both_snapshots(self):
+        org = make_organisation('org@x.com')
+        event = make_event(org)
+        report = PostEventReport.objects.create(event=event, description='r')
+        user = CustomUser.objects.create_user(email='d@x.com', password='x')
+        participant = COPParticipant.objects.create(user=user, accreditation_type='Party', accreditation_number='1',
+                                                    name='D', email='d@x.com', organization=org)
+        changes = [
+            ('event save', event.save),
+            ('report save', report.save),
+            ('participant save', participant.save),
+            ('organisation save', org.save),
+            ('participant delete', participant.delete),
+            ('report delete', report.delete),
+            ('event delete', event.delete),
+            ('organisation delete', org.delete),
+        ]
+        for name, change in changes:
+            with self.subTest(change=name):
+                get_cop_stats()
+                get_cop_stats(org)
+                misses = cache_counters()['stats']['miss']
+                change()
+                get_cop_stats()
+                get_cop_stats(org)
+                self.assertEqual(cache_counters()['stats']['miss'], misses + 2)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    LOGIN_MAX_FAILURES_PER_ACCOUNT=3,
+    LOGIN_MAX_FAILURES_PER_IP=5,
+    LOGIN_IP_HEADER='HTTP_X_REAL_IP',
+)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='a@x.com', password='right', name='A', is_verified=True)
+        self.hashes = 0
+        for method in ('encode', 'verify'):
+            original = getattr(MD5PasswordHasher, method)
+            patcher = mock.patch.object(MD5PasswordHasher, method, autospec=True, side_effect=self.counted(original))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def counted(self, method):
+        def wrapper(*args, **kwargs):
+            self.hashes += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    def login(self, email='a@x.com', password='wrong', ip='10.0.0.1'):
+        request = RequestFactory().post('/login/', HTTP_X_REAL_IP=ip)
+        return request, authenticate(request, username=email, password=password)
+
+    def test_throttled_attempts_hash_nothing(self):
+        for _ in range(3):
+            self.login()
+        self.hashes = 0
+        request, user = self.login(password='right')
+        self.assertIsNone(user)
+        self.assertTrue(request.login_throttled)
+        self.assertEqual(self.hashes, 0)
+
+    def test_ip_limit_covers_every_account(self):
+        for number in range(5):
+            self.login(email='nobody%d@x.com' % number)
+        self.assertIsNone(self.login(password='right')[1])
+        self.assertEqual(self.login(password='right', ip='10.0.0.2')[1], self.user)
+
+    def test_success_clears_the_account_counter(self):
+        for _ in range(2):
+            self.login()
+        self.assertEqual(self.login(password='right')[1], self.user)
+        for _ in range(2):
+            self.login()
+        self.assertEqual(self.login(password='right')[1], self.user)
+
+    def test_signin_explains_the_throttle(self):
+        for _ in range(3):
+            self.client.post('/login/', {'username': 'a@x.com', 'password': 'wrong'})
+        response = self.client.post('/login/', {'username': 'a@x.com', 'password': 'right'})
+        self.assertContains(response, 'Too many failed sign-in attempts')
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+
+def use_temporary_media(test):
+    media = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media, ignore_errors=True)
+    media_root = override_settings(MEDIA_ROOT=media)
+    media_root.enable()
+    test.addCleanup(media_root.disable)
+    return media
+
+
+def image_bytes(size=(20, 20), format='PNG', **save):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format, **save)
+    return buffer.getvalue()
+
+
+class UploadHandlerTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.org = make_organisation('org@x.com')
+        self.client.force_login(self.org.user)
+
+    def post(self, **files):
+        data = {
+            'organisation_type': 'NGO/iNGO', 'contact_number': 1, 'address_line': 'Abuja',
+            'state': 'F.C.T', 'focus_area': 'Agriculture', 'description': 'd',
+        }
+        for name, (filename, content) in files.items():
+            data[name] = SimpleUploadedFile(filename, content)
+        return self.client.post('/org_update/', data)
+
+    @override_settings(UPLOAD_LIMITS={'logo': (1024, 'image')})
+    def test_oversize_body_is_dropped_mid_stream(self):
+        handler = LimitedUploadHandler()
+        handler.new_file('logo', 'logo.png', 'image/png', None)
+        first = image_bytes()
+        self.assertEqual(handler.receive_data_chunk(first, 0), first)
+        self.assertIsNone(handler.receive_data_chunk(b'\0' * 1024, len(first)))
+        self.assertIsNone(handler.receive_data_chunk(b'\0' * 16, len(first) + 1024))
+        upload = handler.file_complete(len(first) + 1040)
+        self.assertIsInstance(upload, RejectedUpload)
+        self.assertIn('too large', upload.error)
+
+    @override_settings(UPLOAD_LIMITS={'logo': (1024, 'image')})
+    def test_oversize_upload_is_a_field_error(self):
+        response = self.post(logo=('logo.png', image_bytes() + b'\0' * 2048))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('The uploaded file is too large', response.context['form'].errors['logo'][0])
+        self.org.refresh_from_db()
+        self.assertFalse(self.org.logo)
+
+    def test_bad_magic_bytes_are_refused(self):
+        response = self.post(logo=('logo.png', b'MZ not really a png'))
+        self.assertEqual(response.context['form'].errors['logo'], [INVALID_IMAGE])
+
+    @override_settings(UPLOAD_MAX_IMAGE_PIXELS=100)
+    def test_megapixel_limit(self):
+        response = self.post(logo=('logo.png', image_bytes((20, 20))))
+        self.assertIn('The uploaded image is too large', response.context['form'].errors['logo'][0])
+
+    def test_pdf_certificate_is_accepted(self):
+        response = self.post(certificate=('cac.pdf', b'%PDF-1.4\n%%EOF\n'))
+        self.assertRedirects(response, '/org_update/', fetch_redirect_response=False)
+        self.org.refresh_from_db()
+        self.assertTrue(self.org.certificate.name.endswith('.pdf'))
+
+    def test_pdf_logo_is_refused(self):
+        response = self.post(logo=('logo.pdf', b'%PDF-1.4\n%%EOF\n'))
+        self.assertEqual(response.context['form'].errors['logo'], [INVALID_IMAGE])
+
+
+class KeysetPaginationTests(TestCase):
+    ordering = ('-date_created', '-id')
+
+    def setUp(self):
+        event = make_event(make_organisation('org@x.com'))
+        reports = [PostEventReport.objects.create(event=event, description='r') for _ in range(7)]
+        # date_created is a DateField, so most rows tie on it and only id separates them
+        PostEventReport.objects.filter(pk__in=[reports[1].pk, reports[4].pk]).update(
+            date_created=timezone.localdate() - timedelta(days=1))
+        self.expected = list(PostEventReport.objects.order_by(*self.ordering).values_list('id', flat=True))
+
+    def page(self, cursor=None):
+        request = RequestFactory().get('/report_list', {'cursor': cursor} if cursor else {})
+        return keyset_paginate(request, PostEventReport.objects.all(), self.ordering, page_size=3)
+
+    def ids(self, page):
+        return [report.id for report in page]
+
+    def test_walking_forward_visits_every_row_once(self):
+        seen, page = [], self.page()
+        while True:
+            seen += self.ids(page)
+            if not page.has_next:
+                break
+            page = self.page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(page), 1)
+        self.assertIsNone(page.next_cursor)
+
+    def test_next_then_prev_returns_the_first_page(self):
+        first = self.page()
+        second = self.page(first.next_cursor)
+        self.assertEqual(self.ids(second), self.expected[3:6])
+        back = self.page(second.prev_cursor)
+        self.assertEqual(self.ids(back), self.ids(first))
+        self.assertFalse(back.has_previous)
+        self.assertEqual(back.next_cursor, first.next_cursor)
+
+    def test_garbage_cursor_falls_back_to_the_first_page(self):
+        for cursor in ('not-a-cursor', encode_cursor(['x'], 'sideways'), encode_cursor(['2024-01-01'], 'next')):
+            page = self.page(cursor)
+            self.assertEqual(self.ids(page), self.expected[:3])
+            self.assertFalse(page.has_previous)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['backend.hashers.TunedArgon2PasswordHasher', 'backend.hashers.TunedPBKDF2PasswordHasher'],
+    PASSWORD_ARGON2_TIME_COST=1,
+    PASSWORD_ARGON2_MEMORY_COST=64,
+    PASSWORD_ARGON2_PARALLELISM=1,
+    PASSWORD_PBKDF2_ITERATIONS=1000,
+)
+class PasswordUpgradeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='a@x.com', password='x', name='A', is_verified=True)
+
+    def sign_in_with(self, encoded):
+        CustomUser.objects.filter(pk=self.user.pk).update(password=encoded)
+        user = authenticate(RequestFactory().post('/login/'), username='a@x.com', password='secret')
+        self.assertIsNotNone(user)
+        return CustomUser.objects.get(pk=self.user.pk).password
+
+    def test_legacy_pbkdf2_hash_moves_to_argon2(self):
+        legacy = PBKDF2PasswordHasher().encode('secret', 'legacysalt', iterations=1200)
+        stored = self.sign_in_with(legacy)
+        self.assertTrue(stored.startswith('argon2$argon2id$v=19$m=64,t=1,p=1$'))
+
+    def test_argon2_hash_at_old_costs_is_rehashed(self):
+        with self.settings(PASSWORD_ARGON2_MEMORY_COST=32):
+            old = make_password('secret')
+        self.assertIn('m=32,t=1,p=1', old)
+        stored = self.sign_in_with(old)
+        self.assertNotEqual(stored, old)
+        self.assertIn('m=64,t=1,p=1', stored)
+
+    def test_current_hash_is_left_alone(self):
+        current = make_password('secret')
+        self.assertEqual(self.sign_in_with(current), current)
+
+
+@override_settings(IMAGE_FORMAT='JPEG', IMAGE_MAX_DIMENSION=100)
+class ImagePipelineTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.org = make_organisation('org@x.com')
+
+    def rotated_photo(self):
+        # Stored landscape, but EXIF orientation 6 says it is shown portrait
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        return SimpleUploadedFile('photo.jpg', image_bytes((300, 200), 'JPEG', exif=exif.tobytes()))
+
+    def test_new_upload_queues_one_job_and_resave_none(self):
+        self.org.logo = self.rotated_photo()
+        self.org.save()
+        self.assertEqual(ImageJob.objects.filter(field='logo', name=self.org.logo.name).count(), 1)
+        self.org.description = 'updated'
+        self.org.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+    def test_processing_rotates_strips_and_thumbnails(self):
+        self.org.logo = self.rotated_photo()
+        self.org.save()
+        original = self.org.logo.name
+        storage = self.org.logo.storage
+
+        self.assertEqual(dispatch_image_jobs(), (1, 0))
+        self.org.refresh_from_db()
+        self.assertNotEqual(self.org.logo.name, original)
+        self.assertFalse(storage.exists(original))
+        with Image.open(self.org.logo.path) as logo:
+            self.assertEqual(logo.size, (67, 100))
+            self.assertEqual(len(logo.getexif()), 0)
+        with Image.open(self.org.logo_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (160, 160))
+        self.assertEqual(ImageJob.objects.get().status, 'Done')
+
+    def test_job_for_a_replaced_file_does_nothing(self):
+        self.org.logo = self.rotated_photo()
+        self.org.save()
+        self.org.logo = SimpleUploadedFile('second.png', image_bytes())
+        self.org.save()
+        replacement = self.org.logo.name
+        ImageJob.objects.filter(name=replacement).delete()
+
+        self.assertEqual(dispatch_image_jobs(), (1, 0))
+        self.org.refresh_from_db()
+        self.assertEqual(self.org.logo.name, replacement)
+        self.assertFalse(self.org.logo_thumbnail)
+        self.assertTrue(self.org.logo.storage.exists(replacement))
+
+
+class SessionActivityTests(TestCase):
+    def setUp(self):
+        self.now = 1_700_000_000
+        clock = mock.patch('backend.middleware.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.admin = CustomUser.objects.create_user(email='admin@x.com', password='x', name='Admin', role='Admin')
+        self.client.force_login(self.admin)
+
+    def session_writes(self, path='/organisations/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        writes = [
+            query['sql'] for query in queries
+            if 'django_session' in query['sql'] and query['sql'].lstrip().startswith(('INSERT', 'UPDATE'))
+        ]
+        return response, writes
+
+    def test_requests_within_the_resolution_leave_the_session_alone(self):
+        self.assertTrue(self.session_writes()[1])
+        for _ in range(3):
+            self.now += settings.SESSION_ACTIVITY_RESOLUTION // 4
+            response, writes = self.session_writes()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(writes, [])
+        self.now += settings.SESSION_ACTIVITY_RESOLUTION
+        self.assertTrue(self.session_writes()[1])
+
+    def test_idle_session_is_logged_out(self):
+        self.client.get('/organisations/')
+        self.now += settings.SESSION_IDLE_TIMEOUT + 1
+        response = self.client.get('/organisations/')
+        self.assertRedirects(response, '/login/?next=/organisations/', fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+
+class PurgeSessionsTests(TestCase):
+    def test_only_expired_sessions_are_removed(self):
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(session_key='old%d' % number, session_data='', expire_date=now - timedelta(minutes=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+
+        out = io.StringIO()
+        call_command('purge_sessions', batch_size=2, pause=0, stdout=out)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        self.assertIn('Purged 5 expired sessions', out.getvalue())
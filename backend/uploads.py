@@ -0,0 +1,96 @@
+import io
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import ImageFile
+
+IMAGE_SIGNATURES = [b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a']
+PDF_SIGNATURE = b'%PDF-'
+# An image whose dimensions cannot be read from this many bytes is refused
+HEADER_LIMIT = 512 * 1024
+
+
+def is_image_header(data):
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return True
+    return any(data.startswith(signature) for signature in IMAGE_SIGNATURES)
+
+
+def is_document_header(data):
+    return data.startswith(PDF_SIGNATURE) or is_image_header(data)
+
+
+INVALID_IMAGE = 'Upload a valid image. The file you uploaded was either not an image or a corrupted image.'
+
+SNIFFERS = {
+    'image': is_image_header,
+    'document': is_document_header,
+}
+
+
+class RejectedUpload(UploadedFile):
+    # Stands in for an upload the handler refused; forms using
+    # UploadErrorsMixin report `error` against the field
+    def __init__(self, name, error):
+        super().__init__(io.BytesIO(), name=name, size=0)
+        self.error = error
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    # Runs ahead of Django's memory and temporary-file handlers. Fields listed in
+    # UPLOAD_LIMITS are checked as the body streams in; once a file breaks a
+    # rule its remaining chunks are dropped instead of being buffered or spooled.
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.max_size, self.kind = settings.UPLOAD_LIMITS.get(field_name, (None, None))
+        self.received = 0
+        self.error = None
+        self.parser = ImageFile.Parser() if self.kind == 'image' else None
+
+    def reject(self, error):
+        self.error = error
+        self.parser = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        if self.max_size is None:
+            return raw_data
+
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.reject('The uploaded file is too large. The maximum file size is %dMB.' % (self.max_size // (1024 * 1024)))
+            return None
+
+        sniff = SNIFFERS.get(self.kind)
+        if start == 0 and sniff and not sniff(raw_data):
+            self.reject(INVALID_IMAGE if self.kind == 'image' else 'Upload a PDF or an image.')
+            return None
+
+        if self.parser is not None:
+            self.check_dimensions(raw_data)
+        return raw_data if not self.error else None
+
+    def check_dimensions(self, raw_data):
+        # The parser only needs the header; it is dropped as soon as the size is known
+        try:
+            self.parser.feed(raw_data)
+        except Exception:
+            self.reject(INVALID_IMAGE)
+            return
+        image = self.parser.image
+        if image is None:
+            if self.received > HEADER_LIMIT:
+                self.reject(INVALID_IMAGE)
+            return
+        width, height = image.size
+        if width * height > settings.UPLOAD_MAX_IMAGE_PIXELS:
+            self.reject('The uploaded image is too large. The maximum is %d megapixels.' % (settings.UPLOAD_MAX_IMAGE_PIXELS // 1000000))
+        self.parser = None
+
+    def file_complete(self, file_size):
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+        # Let the next handler return the file it built
+        return None
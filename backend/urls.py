@@ -1,3 +1,5 @@
+from . import api
+from . import live
 from . import views
 from django.urls import path
 from django.contrib.auth import views as auth_views
@@ -28,5 +30,14 @@ urlpatterns = [
     path('org_event/', views.org_event, name='org_event'),
     path('org_event_profile/<str:pk>/', views.org_event_profile, name='org_event_profile'),
     path('activist/', views.activist_dashboard, name='activist'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
+
+    # Read-only JSON API for the venue screens and the mobile app
+    path('api/v1/events/', api.events, name='api_events'),
+    path('api/v1/events/<int:pk>/', api.event, name='api_event'),
+    path('api/v1/reports/', api.reports, name='api_reports'),
+    path('api/v1/reports/<int:pk>/', api.report, name='api_report'),
+    path('api/v1/stats/', api.stats, name='api_stats'),
+    path('live/events-today/', live.events_today_stream, name='events_today_stream'),
 
 ]
\ No newline at end of file
@@ -1,17 +1,15 @@
-from datetime import timedelta
-from datetime import date
-
-from django.db.models import Q
-from django.db.models import Sum
 from django.db.models import Count
+from django.db.models import Q
 
 from django.shortcuts import render, redirect,get_object_or_404
 from django.shortcuts import render, HttpResponse, redirect, HttpResponseRedirect
+from django.http import JsonResponse
 
 from django.utils.http import urlsafe_base64_encode
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
 from django.utils.encoding import force_bytes
+from django.utils import timezone
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.tokens import default_token_generator
@@ -22,7 +20,7 @@ from django.contrib import messages
 from .tokens import account_activation_token
 from django.views.generic import TemplateView
 from django.urls import reverse, reverse_lazy
-from django.core.mail import send_mail
+from django.core.mail import get_connection, send_mail
 from django.template.loader import render_to_string
 
 #models
@@ -40,6 +38,14 @@ from .models import Activist
 from .models import Announcement
 from .models import Event
 
+from .authentication import current_organisation, login_counters
+from .broadcast import announcement_recipients, queue_broadcast
+from .caching import cache_counters, cache_for_anonymous
+from .delegates import DelegateFileError, delegate_password_hash, delegate_welcome_message, import_delegates, new_delegate_user, user_name_error
+from .pagination import keyset_paginate
+from .routers import read_from_replica
+from .stats import get_cop_stats
+
 #forms
 from django import forms
 from .forms import OrgEventForm
@@ -52,6 +58,7 @@ from .forms import CustomPasswordChangeForm
 from .forms import OrganisationForm
 from .forms import StatusForm
 from .forms import DelegateForm
+from .forms import DelegateImportForm
 from .forms import EventForm
 from .forms import ReportForm
 from .forms import AnnouncementForm
@@ -83,38 +90,25 @@ def activate(request, uidb64, token):
         return HttpResponse('Activation link is invalid!')
 
 
+@cache_for_anonymous
+@read_from_replica
 def index(request):
-    event = COPEventApplication.objects.all()
-    delegates = COPParticipant.objects.count()
-    organisations = Organisation.objects.count()
-    side_events = COPEventApplication.objects.filter(status='Approved').count()
-    
-    report = PostEventReport.objects.filter(event__isnull=False).order_by('-id')[:3]
-    total_speakers = COPEventApplication.objects.filter(posteventreport__isnull=False).aggregate(Sum('number_of_speakers'))['number_of_speakers__sum'] or 0
-    host = COPEventApplication.objects.filter(posteventreport__isnull=False).values('org').annotate(Count('org')).count()
-    session = PostEventReport.objects.filter(event__isnull=False).count()
-    
-    total_duration = timedelta()
-    for event in COPEventApplication.objects.filter(posteventreport__isnull=False):
-        total_duration += event.end_time - event.start_time
-    total_duration = total_duration.total_seconds() / 3600
-    total_duration = int(total_duration)
+    stats = get_cop_stats()
+    report = PostEventReport.objects.for_listing().order_by('-id')[:3]
 
-    today = date.today()
+    today = timezone.localdate()
 
-    events_today = COPEventApplication.objects.filter(
-        Q(start_time__date=today)
-    )
+    events_today = COPEventApplication.objects.for_listing().starting_on(today)
 
     context = {
         'report': report,
-        'session': session,
-        'total_speakers': total_speakers,
-        'total_duration': total_duration,
-        'host': host,
-        'delegates': delegates,
-        'organisations': organisations,
-        'side_events': side_events,
+        'session': stats['session'],
+        'total_speakers': stats['total_speakers'],
+        'total_duration': int(stats['total_duration']),
+        'host': stats['host'],
+        'delegates': stats['delegates'],
+        'organisations': stats['organisations'],
+        'side_events': stats['side_events'],
         'events_today': events_today,
     }
 
@@ -140,7 +134,7 @@ def signin(request):
                     elif user_role == 'Admin':
                         return redirect('admin-cop')
                     elif user_role == 'Organisation':
-                        if Organisation.objects.filter(user=user).exists():
+                        if current_organisation(request) is not None:
                             return redirect('org_dashbord')
                         else:
                             return redirect('org_profile')
@@ -152,6 +146,8 @@ def signin(request):
                     context['error_message'] = 'Profile information is missing. Contact the administrator.'
             else:
                 context['login_error'] = 'Account is not verified. Please check your emails and verify your account first.'
+        elif getattr(request, 'login_throttled', False):
+            context['login_error'] = 'Too many failed sign-in attempts. Please wait a few minutes and try again.'
         else:
             context['login_error'] = 'Invalid credentials.'
 
@@ -169,16 +165,11 @@ def Register(request):
         if form.is_valid():
             register = form.save()
 
-            try:
-                register.send_verification_email(request)
-                messages.success(
-                    request, 'A verification email has been sent to your email address.')
-                return redirect('home')
-
-                # Handle error (could log it, notify admins, or inform the user)
-            except Exception as e:
-                messages.error(
-                    request, f'There was an error sending the verification email: {e}')
+            # Only queued here; send_queued_mail delivers it outside the request
+            register.send_verification_email(request)
+            messages.success(
+                request, 'A verification email has been sent to your email address.')
+            return redirect('home')
 
     context = {
         'form': form,
@@ -234,11 +225,16 @@ def password_reset_confirm(request, uidb64, token):
         if request.method == "POST":
             form = CustomSetPasswordForm(user, request.POST)
             if form.is_valid():
-                form.save()
+                user = form.save(commit=False)
+                # Delegates created by NCCC confirm their email by following the set-password link
+                user.is_verified = True
+                user.save()
                 return redirect('login')
         else:
             form = CustomSetPasswordForm(user)
         return render(request, 'account/password_reset_confirm.html', {'form': form})
+    else:
+        return HttpResponse('Password reset link is invalid!')
 
 
 # @login_required
@@ -259,37 +255,24 @@ def change_password(request):
     return render(request, 'account/update_password.html', {'form': form})
 
 @login_required
+@read_from_replica
 def cop_admin(request):
-    event = COPEventApplication.objects.all()
-    delegates = COPParticipant.objects.count()
-    organisations = Organisation.objects.count()
-    side_events = COPEventApplication.objects.filter(status='Approved').count()
-    
-    report = PostEventReport.objects.filter(event__isnull=False).order_by('-id')[:3]
-    total_speakers = COPEventApplication.objects.filter(posteventreport__isnull=False).aggregate(Sum('number_of_speakers'))['number_of_speakers__sum'] or 0
-    host = COPEventApplication.objects.filter(posteventreport__isnull=False).values('org').annotate(Count('org')).count()
-    session = PostEventReport.objects.filter(event__isnull=False).count()
-    
-    total_duration = timedelta()
-    for event in COPEventApplication.objects.filter(posteventreport__isnull=False):
-        total_duration += event.end_time - event.start_time
-    total_duration = total_duration.total_seconds() / 3600
+    stats = get_cop_stats()
+    report = PostEventReport.objects.for_listing().order_by('-id')[:3]
 
-    today = date.today()
+    today = timezone.localdate()
 
-    events_today = COPEventApplication.objects.filter(
-        Q(start_time__date=today)
-    )
+    events_today = COPEventApplication.objects.for_listing().starting_on(today)
 
     context = {
         'report': report,
-        'session': session,
-        'total_speakers': total_speakers,
-        'total_duration': total_duration,
-        'host': host,
-        'delegates': delegates,
-        'organisations': organisations,
-        'side_events': side_events,
+        'session': stats['session'],
+        'total_speakers': stats['total_speakers'],
+        'total_duration': stats['total_duration'],
+        'host': stats['host'],
+        'delegates': stats['delegates'],
+        'organisations': stats['organisations'],
+        'side_events': stats['side_events'],
         'events_today': events_today,
     }
 
@@ -298,7 +281,7 @@ def cop_admin(request):
 
 @login_required
 def org(request):
-    members = Organisation.objects.all()
+    page = keyset_paginate(request, Organisation.objects.for_listing(), ('-date_created', '-id'))
 
     mda = Organisation.objects.filter(organisation_type='GO/MDAs').count()
     ngo = Organisation.objects.filter(organisation_type='NGO/iNGO').count()
@@ -306,7 +289,8 @@ def org(request):
     youth = Organisation.objects.filter(organisation_type='Women/YouthLead').count()
 
     context = {
-        'members' : members,
+        'members' : page.object_list,
+        'page': page,
         'mda': mda,
         'ngo': ngo,
         'youth': youth,
@@ -341,42 +325,67 @@ def org_prof(request, pk):
 
 @login_required
 def accreditation(request):
-    delegates = COPParticipant.objects.all()
-    nccc = COPParticipant.objects.filter(accredited_by='NCCC').count()
-    val = COPParticipant.objects.count()
-    others = val - nccc
-
     form = DelegateForm(request.POST)
+    import_form = DelegateImportForm()
+    import_result = None
+
+    if request.method == 'POST' and 'delegate_file' in request.FILES:
+        form = DelegateForm()
+        import_form = DelegateImportForm(request.POST, request.FILES)
+        if import_form.is_valid():
+            try:
+                import_result = import_delegates(import_form.cleaned_data['delegate_file'])
+            except DelegateFileError as e:
+                import_form.add_error('delegate_file', str(e))
+            else:
+                messages.success(request, f'{import_result.created} delegates were accredited.')
 
-    if request.method == 'POST' and form.is_valid():
-        email = form.cleaned_data['email']  # Get the email from the form
+                verification = [delegate_welcome_message(user, request.get_host()) for user in import_result.new_users]
+                get_connection().send_messages(verification)
+
+    elif request.method == 'POST' and form.is_valid():
+        email = CustomUser.objects.normalize_email(form.cleaned_data['email'])  # Get the email from the form
 
         try:
             user = CustomUser.objects.get(email=email)
         except CustomUser.DoesNotExist:
-            # User with the provided email doesn't exist, create a new user
-            name = form.cleaned_data['name']
-            password = "Nccc@COP28"
-            role= "Activist"
-            user = CustomUser.objects.create_user(email=email, password=password, name=name, role=role)
-            user.send_verification_email(request)
-
-        form.instance.user = user  # Assign the user to the form
-        form.save()
-        return redirect('accreditation')
-        
+            user = None
+
+        name_error = user_name_error(form.cleaned_data['name']) if user is None else None
+        if name_error:
+            form.add_error('name', name_error)
+        else:
+            if user is None:
+                # User with the provided email doesn't exist, create a new user
+                name = form.cleaned_data['name']
+                user = new_delegate_user(email, name, delegate_password_hash())
+                user.save()
+                delegate_welcome_message(user, request.get_host()).send()
+
+            form.instance.user = user  # Assign the user to the form
+            form.save()
+            return redirect('accreditation')
+
+    nccc = COPParticipant.objects.filter(accredited_by='NCCC').count()
+    val = COPParticipant.objects.count()
+    others = val - nccc
+
+    page = keyset_paginate(request, COPParticipant.objects.for_listing(), ('-id',))
+
     context = {
-        'delegates': delegates,
+        'delegates': page.object_list,
+        'page': page,
         'nccc': nccc,
         'others': others,
-        'form': form
+        'form': form,
+        'import_form': import_form,
+        'import_result': import_result,
     }
 
     return render(request, 'cop/accreditation.html', context)
 
 @login_required
 def side_event(request):
-    events = COPEventApplication.objects.all()
     application = COPEventApplication.objects.count()
     approve = COPEventApplication.objects.filter(status='Approved').count()
     hosted = PostEventReport.objects.count()
@@ -391,8 +400,11 @@ def side_event(request):
     else:
         form = EventForm()
 
+    page = keyset_paginate(request, COPEventApplication.objects.for_listing(), ('-date_created', '-id'))
+
     context = {
-        'events': events,
+        'events': page.object_list,
+        'page': page,
         'form': form,
         'application': application,
         'approve': approve,
@@ -449,24 +461,21 @@ def event_profile(request, pk):
 
 @login_required
 def announcement(request):
-    users = CustomUser.objects.all()
-    email_list = [user.email for user in users]
+    announcement = COPEventAnnouncement.objects.annotate(
+        recipients=Count('deliveries'),
+        delivered=Count('deliveries', filter=Q(deliveries__status='Sent')),
+    ).order_by('-date_created')
 
-    announcement = COPEventAnnouncement.objects.all()
+    preview_count = None
 
     form = AnnouncementForm()
     if request.method == 'POST':
         form = AnnouncementForm(request.POST)
-        if form.is_valid():
-            subject = form.cleaned_data['subject']
-            message = form.cleaned_data['message']
-            #sender = form.cleaned_data['sender']
-
-            from_email = 'no-reply@mhinnov8.com.ng'
-            recipient_list = email_list
-            send_mail(subject, message, from_email,  recipient_list)
-
-            form.save()
+        if form.is_valid() and 'preview' in request.POST:
+            preview_count = announcement_recipients(form.save(commit=False)).count()
+        elif form.is_valid():
+            # Recipients are queued here and mailed by the send_announcements command
+            queue_broadcast(form.save())
             return redirect('announcement')
     else:
         form = AnnouncementForm()
@@ -474,26 +483,32 @@ def announcement(request):
     context = {
         'form': form,
         'announcement': announcement,
+        'preview_count': preview_count,
     }
 
     return render(request, 'cop/announcement.html', context)
 
 
+@cache_for_anonymous
+@read_from_replica
 def event_list(request):
-    today = date.today()
+    today = timezone.localdate()
 
     # Filter events with a start_time in the future
-    event_list = COPEventApplication.objects.filter(start_time__date__gte=today)
+    event_list = COPEventApplication.objects.for_listing().starting_from(today)
 
     # Sort events by start_time
-    event_list = event_list.order_by('start_time')
+    page = keyset_paginate(request, event_list, ('start_time', 'id'))
 
     context = {
-        'event_list': event_list,
+        'event_list': page.object_list,
+        'page': page,
     }
 
     return render(request, 'event_list.html', context)
 
+@cache_for_anonymous
+@read_from_replica
 def event_view(request, pk):
     event_id = get_object_or_404(COPEventApplication, pk=pk)
     
@@ -502,14 +517,19 @@ def event_view(request, pk):
     }
     return render(request, 'event.html', context)
 
+@cache_for_anonymous
+@read_from_replica
 def report_list(request):
-    report_list = PostEventReport.objects.order_by('-date_created')
+    page = keyset_paginate(request, PostEventReport.objects.for_listing(), ('-date_created', '-id'))
 
     context = {
-        'report_list': report_list
+        'report_list': page.object_list,
+        'page': page,
     }
     return render(request, 'report_list.html', context)
 
+@cache_for_anonymous
+@read_from_replica
 def report_view(request, pk):
     report_id = get_object_or_404(PostEventReport, pk=pk)
     
@@ -519,38 +539,21 @@ def report_view(request, pk):
     return render(request, 'report.html', context)
 
 @login_required
+@read_from_replica
 def org_dashboard(request):
-    user = request.user
-
-    try:
-        org = Organisation.objects.get(user=user)
-    except Organisation.DoesNotExist:
-        org = None
-
-    approve = 0
-
-    if org:
-        events = COPEventApplication.objects.filter(org=org)
-        approve = events.filter(status='Approved').count()
-        hosted = PostEventReport.objects.filter(event__in=events, event__isnull=False).count()
-        report = PostEventReport.objects.filter(event__in=events, event__isnull=False).order_by('-id')[:3]
-        total_speakers = events.filter(posteventreport__isnull=False).aggregate(Sum('number_of_speakers'))['number_of_speakers__sum'] or 0
-        host = 1
-        session = PostEventReport.objects.filter(event__in=events, event__isnull=False).count()
-        
-        total_duration = timedelta()
-        for event in COPEventApplication.objects.filter(posteventreport__isnull=False):
-            total_duration += event.end_time - event.start_time
-        total_duration = total_duration.total_seconds() / 3600
-        total_duration = int(total_duration)
-
-        today = date.today()
-
-        events_today = COPEventApplication.objects.filter(
-            Q(start_time__date=today)
-        )
-    else:
-        hosted = 0
+    org = current_organisation(request)
+    if org is None:
+        return redirect('org_profile')
+
+    stats = get_cop_stats(org)
+    events = COPEventApplication.objects.for_listing().filter(org=org)
+    approve = stats['side_events']
+    hosted = stats['session']
+    report = PostEventReport.objects.for_listing().filter(event__org=org).order_by('-id')[:3]
+    total_speakers = stats['total_speakers']
+    host = 1
+    session = stats['session']
+    total_duration = int(stats['total_duration'])
 
     context = {
         'approve': approve,
@@ -588,12 +591,9 @@ def org_register(request):
 @login_required
 def org_update(request):
     user = request.user  # Get the current user
-    member_id = Organisation.objects.get(user=user)
-
-    try:
-        existing_data = Organisation.objects.get(user=user)
-    except Organisation.DoesNotExist:
-        existing_data = None
+    existing_data = current_organisation(request)
+    if existing_data is None:
+        return redirect('org_profile')
 
     if request.method == 'POST':
         form = OrganisationForm(request.POST, request.FILES)
@@ -609,30 +609,21 @@ def org_update(request):
         form = OrganisationForm(instance=existing_data)  # Populate the form with existing data
     context = {
         'form': form,
-        'member_id': member_id,
+        'member_id': existing_data,
     }
 
     return render(request, 'organisation/profile.html', context)
 
 @login_required
 def org_event(request):
-    user = request.user
+    org = current_organisation(request)
+    if org is None:
+        return redirect('org_profile')
 
-    try:
-        org = Organisation.objects.get(user=user)
-    except Organisation.DoesNotExist:
-        org = None
-
-    application = 0
-    approve = 0
-
-    if org:
-        events = COPEventApplication.objects.filter(org=org)
-        application = events.count()
-        approve = events.filter(status='Approved').count()
-        hosted = PostEventReport.objects.filter(event__in=events).count()
-    else:
-        hosted = 0
+    events = COPEventApplication.objects.for_listing().filter(org=org)
+    application = events.count()
+    approve = events.filter(status='Approved').count()
+    hosted = PostEventReport.objects.filter(event__in=events).count()
 
     form = OrgEventForm()
     
@@ -659,7 +650,8 @@ def org_event(request):
 
 @login_required
 def org_event_profile(request, pk):
-    event_id = get_object_or_404(COPEventApplication, pk=pk)
+    # Only the organisation's own applications
+    event_id = get_object_or_404(COPEventApplication, pk=pk, org=current_organisation(request))
     try:
         invoice = Invoice.objects.get(application_id=event_id)
     except Invoice.DoesNotExist:
@@ -703,4 +695,11 @@ def activist_dashboard(request):
 
     }
 
-    return render(request, 'activist/dashboard.html', context)
\ No newline at end of file
+    return render(request, 'activist/dashboard.html', context)
+
+@login_required
+def cache_stats(request):
+    if not (request.user.is_staff or request.user.role == 'Admin'):
+        return HttpResponse(status=403)
+
+    return JsonResponse({**cache_counters(), 'login': login_counters()})
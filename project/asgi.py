@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+# Persistent connections are not safe under ASGI: each request's sync code runs
+# in a pool thread, which would keep its own connection open. Unless overridden,
+# close them at the end of every request.
+os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()